@@ -1,19 +1,26 @@
-from fastapi import FastAPI, HTTPException
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Header, Query, Response
 from pydantic import BaseModel, Field
 from domain.state import state
-from core.logger import get_logger
+from domain.change_detector import change_detector
+from domain.latest_store import latest_store
+from domain.history_store import HISTORY_FIELDS, history_store
+from core.logger import get_logger, logging_stats
+from core.tracing import trace_store
+from utils.weather_utils import gazetteer, geocoding_cache
+from scheduler.collector_loop import rabbit, weather
 
 logger = get_logger("collector.api")
 app = FastAPI(
     title="Weather Collector Service ☁️",
     description="""
     Serviço responsável por coletar dados climáticos da Open-Meteo,
-    enviar para RabbitMQ e permitir troca dinâmica de cidades
+    enviar para RabbitMQ e permitir o registro dinâmico de cidades
     através da API.
 
     🔥 Pipeline:
-    1. NestJS → POST /city → define alvo da coleta
-    2. Collector busca dados a cada 1h
+    1. NestJS → POST /city → registra cidade para coleta
+    2. Collector busca dados de todas as cidades a cada 1h (em paralelo)
     3. Publica no RabbitMQ para enriquecimento pelo módulo IA
     """,
     version="1.0.0",
@@ -28,15 +35,156 @@ class CityPayload(BaseModel):
     city: str = Field(..., min_length=2, description="Cidade alvo da coleta")
 
 
+def _etag_response(body: bytes, etag: str, if_none_match: Optional[str]) -> Response:
+    # 304 quando o cliente já tem a versão atual (If-None-Match)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if if_none_match:
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        if "*" in candidates or etag in candidates or f"W/{etag}" in candidates:
+            return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _clean_city(city: str) -> str:
+    city = city.strip()
+
+    if len(city) < 2:
+        raise HTTPException(status_code=400, detail="Cidade inválida")
+
+    return city
+
+
 # ⤵ Rotas da aplicação
 @app.post("/city")
 async def update_city(payload: CityPayload):
-    city = payload.city.strip()
-
-    if not city:
-        raise HTTPException(status_code=400, detail="Cidade inválida")
+    # Mantido para compatibilidade com o NestJS: registra a cidade
+    city = _clean_city(payload.city)
 
     await state.set_city(city)
-    logger.info(f"🌍 Cidade definida para coleta: {city}")
+    logger.info("🌍 Cidade registrada para coleta: %s", city)
 
     return {"message": "Cidade atualizada com sucesso", "city": city}
+
+
+@app.post("/cities", status_code=201)
+async def add_city(payload: CityPayload):
+    city = _clean_city(payload.city)
+
+    created = await state.add_city(city)
+    if created:
+        logger.info("🌍 Cidade registrada para coleta: %s", city)
+
+    return {"message": "Cidade registrada" if created else "Cidade já registrada", "city": city}
+
+
+@app.get("/cities")
+async def list_cities():
+    cities = await state.list_cities()
+    return {"total": len(cities), "cities": cities}
+
+
+@app.delete("/cities/{city}")
+async def remove_city(city: str):
+    removed = await state.remove_city(city)
+
+    if not removed:
+        raise HTTPException(status_code=404, detail="Cidade não registrada")
+
+    change_detector.forget(city)
+    latest_store.remove(city)
+    history_store.remove(city)
+    weather.forget(city)
+
+    logger.info("🗑 Cidade removida da coleta: %s", city)
+    return {"message": "Cidade removida", "city": city}
+
+
+@app.get("/cities/{city}/latest")
+async def latest_reading(city: str, if_none_match: Optional[str] = Header(None)):
+    # Lido direto da memória, sem passar pelo lock do CollectorState
+    entry = latest_store.get(city)
+
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Nenhuma leitura disponível para a cidade")
+
+    body, etag = entry
+    return _etag_response(body, etag, if_none_match)
+
+
+@app.get("/cities/{city}/history")
+async def city_history(
+    city: str,
+    since: Optional[float] = Query(None, description="Início (unix, segundos)"),
+    until: Optional[float] = Query(None, description="Fim (unix, segundos)"),
+    buckets: Optional[int] = Query(None, ge=1, le=1000, description="Agrega em N intervalos (min/max/média)"),
+    fields: Optional[str] = Query(None, description="Métricas separadas por vírgula"),
+):
+    # Histórico recente em memória (HISTORY_CAPACITY leituras por cidade)
+    selected = [f.strip() for f in fields.split(",") if f.strip()] if fields else list(HISTORY_FIELDS)
+    unknown = [f for f in selected if f not in HISTORY_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=400, detail=f"Métricas válidas: {', '.join(HISTORY_FIELDS)}"
+        )
+
+    result = history_store.query(city, since, until, buckets, selected)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Nenhum histórico disponível para a cidade")
+    return result
+
+
+@app.get("/latest")
+async def latest_readings(
+    cities: str = Query(..., description="Cidades separadas por vírgula"),
+    if_none_match: Optional[str] = Header(None),
+):
+    names = list(dict.fromkeys(c.strip() for c in cities.split(",") if c.strip()))
+
+    if not names:
+        raise HTTPException(status_code=400, detail="Informe ao menos uma cidade")
+
+    body, etag = latest_store.get_many(names)
+    return _etag_response(body, etag, if_none_match)
+
+
+@app.get("/geocode/search")
+async def search_cities(
+    q: str = Query(..., min_length=1, description="Início do nome da cidade (sem diferenciar acentos)"),
+    limit: int = Query(10, ge=1, le=100),
+):
+    # Autocomplete pelo gazetteer offline (GAZETTEER_PATH), mais populosas primeiro
+    if not gazetteer.enabled:
+        raise HTTPException(status_code=503, detail="Gazetteer offline não configurado")
+    return {"query": q, "results": gazetteer.search(q, limit)}
+
+
+@app.get("/traces")
+async def recent_traces(limit: int = Query(50, ge=1, le=1000)):
+    # Últimas leituras rastreadas: etapas geocode/fetch/publish em ms
+    return trace_store.recent(limit)
+
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    trace = trace_store.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace não encontrado")
+    return trace
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "cities": len(await state.list_cities()),
+        "latest_readings": len(latest_store),
+        "history": history_store.stats(),
+        "geocoding_cache": geocoding_cache.stats(),
+        "gazetteer": gazetteer.stats(),
+        "fetch_cache": weather.fetch_cache.stats(),
+        "forecast_buffer": weather.forecast_buffer.stats() if weather.hourly_mode else None,
+        "rabbitmq": rabbit.stats(),
+        "change_detection": change_detector.stats(),
+        "logging": logging_stats(),
+    }
@@ -1,14 +1,47 @@
+import asyncio
 import json
+import time
 import aio_pika
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
 from aio_pika import Message, DeliveryMode
+from aio_pika.exceptions import DeliveryError
+from clients.spool import DiskSpool, SpoolPosition
+from core.config import config
+from core.envelope import (
+    COMPRESSIONS,
+    ENVELOPE_CONTENT_TYPE,
+    ENVELOPE_VERSION,
+    ENVELOPE_VERSION_HEADER,
+    encode_envelope,
+)
 from core.logger import get_logger
+from core.tracing import add_stage, annotate, elapsed_ms, trace_headers
 
 logger = get_logger("collector.rabbitmq")
 
 
+@dataclass
+class PublishResult:
+    # Resultado individual de publish_many (confirmado pelo broker ou não)
+    index: int
+    external_id: Optional[str]
+    confirmed: bool
+    error: Optional[str] = None
+    spooled: bool = False
+
+
 class RabbitMQPublisher:
-    def __init__(self, amqp_url: str, exchange: str, queue: str):
+    def __init__(
+        self,
+        amqp_url: str,
+        exchange: str,
+        queue: str,
+        spool: Optional[DiskSpool] = None,
+        envelope_max_readings: int = 0,
+        envelope_compression: str = "none",
+    ):
         self.amqp_url = amqp_url
         self.exchange_name = exchange
         self.queue_name = queue
@@ -17,11 +50,54 @@ class RabbitMQPublisher:
         self.exchange: Optional[aio_pika.Exchange] = None
         self.queue: Optional[aio_pika.Queue] = None
 
+        # Spool local: guarda payloads enquanto o broker está indisponível.
+        # Todo I/O do spool (fsync incluso) roda num único thread: fora do event loop e em ordem.
+        self.spool = spool
+        self._spool_io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spool") if spool else None
+        self._spool_writes = 0
+        # Posições já confirmadas pelo broker além do cursor (replay parcial): não são reenviadas
+        self._replayed_ahead: Set[SpoolPosition] = set()
+        self._tasks: List[asyncio.Task] = []
+
+        # Envelope (opt-in): publish_many e o replay do spool agrupam até N leituras por mensagem
+        self.envelope_max_readings = envelope_max_readings
+        if envelope_compression not in COMPRESSIONS:
+            logger.warning("⚠ ENVELOPE_COMPRESSION='%s' desconhecido. Usando 'none'", envelope_compression)
+            envelope_compression = "none"
+        self.envelope_compression = envelope_compression
+        self.envelopes_published = 0
+
+    @property
+    def is_connected(self) -> bool:
+        return (
+            self.exchange is not None
+            and self.connection is not None
+            and not self.connection.is_closed
+        )
+
+    async def start(self):
+        # Conecta em segundo plano (não bloqueia o boot) e inicia o replay do spool
+        self._tasks.append(asyncio.create_task(self._connect_loop()))
+        if self.spool:
+            self._tasks.append(asyncio.create_task(self._replay_loop()))
+
+    async def _connect_loop(self):
+        delay = 1.0
+        while not self.is_connected:
+            try:
+                await self.connect()
+                return
+            except Exception:
+                logger.warning("⏳ RabbitMQ indisponível — nova tentativa em %.0fs", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
     async def connect(self):
         # Conecta ao RabbitMQ
         try:
             self.connection = await aio_pika.connect_robust(self.amqp_url)
-            self.channel = await self.connection.channel()
+            # Publisher confirms: cada publish aguarda o ack/nack do broker
+            self.channel = await self.connection.channel(publisher_confirms=True)
 
             self.exchange = await self.channel.declare_exchange(
                 self.exchange_name, aio_pika.ExchangeType.FANOUT, durable=True
@@ -33,34 +109,275 @@ class RabbitMQPublisher:
             )
             await self.queue.bind(self.exchange)
 
-            logger.info(f"✅ Conectado ao RabbitMQ: exchange={self.exchange_name}, queue={self.queue_name}")
+            logger.info("✅ Conectado ao RabbitMQ: exchange=%s, queue=%s", self.exchange_name, self.queue_name)
 
         except Exception as e:
-            logger.error(f"❌ Erro ao conectar RabbitMQ: {e}")
+            logger.error("❌ Erro ao conectar RabbitMQ: %s", e)
+            await self._discard_connection()
             raise
 
-    async def publish(self, payload: Dict):
-        # Publica um payload JSON na exchange do RabbitMQ.
+    async def _discard_connection(self):
+        # Conexão aberta pela metade (ex: falha ao abrir o canal ou declarar a exchange):
+        # fecha antes da próxima tentativa para não acumular conexões no broker
+        connection = self.connection
+        self.connection = self.channel = self.exchange = self.queue = None
+        if connection is not None and not connection.is_closed:
+            try:
+                await connection.close()
+            except Exception as e:
+                logger.warning("⚠ Erro ao fechar conexão RabbitMQ incompleta: %s", e)
+
+    def _spool_backlog(self) -> bool:
+        # Enquanto houver pendências no spool, leituras novas entram atrás delas (ordem preservada)
+        return bool(self.spool and (self.spool.depth or self._spool_writes))
+
+    async def _spool_call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._spool_io, fn, *args)
+
+    async def _spool_append(self, payloads: List[Dict]):
+        self._spool_writes += 1
+        try:
+            await self._spool_call(self.spool.append_many, payloads)
+        finally:
+            self._spool_writes -= 1
+
+    @staticmethod
+    def _build_message(payload: Dict, trace: Optional[Dict] = None) -> Message:
+        # Com trace, as etapas já medidas seguem nos headers para o IA-Service
+        return Message(
+            json.dumps(payload).encode("utf-8"),
+            content_type="application/json",
+            delivery_mode=DeliveryMode.PERSISTENT,
+            headers=trace_headers(trace) if trace else None,
+        )
+
+    def _build_envelope(self, payloads: List[Dict], traces: Optional[List[Optional[Dict]]] = None) -> Message:
+        # Headers de trace seguem por leitura dentro do corpo do envelope
+        body, content_encoding = encode_envelope(
+            payloads,
+            [trace_headers(trace) if trace else None for trace in traces] if traces else None,
+            self.envelope_compression,
+        )
+        return Message(
+            body,
+            content_type=ENVELOPE_CONTENT_TYPE,
+            content_encoding=content_encoding,
+            delivery_mode=DeliveryMode.PERSISTENT,
+            headers={ENVELOPE_VERSION_HEADER: ENVELOPE_VERSION},
+        )
+
+    async def publish(self, payload: Dict, trace: Optional[Dict] = None):
+        # Publica um payload JSON na exchange do RabbitMQ (ou no spool, se o broker estiver fora
+        # ou o spool ainda tiver pendências a reenviar).
+        if self.spool and (not self.exchange or self._spool_backlog()):
+            await self._spool_append([payload])
+            annotate(trace, spooled=True)
+            if self.exchange:
+                logger.info("📼 Spool com pendências — mensagem enfileirada atrás delas")
+            else:
+                logger.warning("📼 RabbitMQ indisponível — mensagem guardada no spool")
+            return
+
         if not self.exchange:
             raise RuntimeError("Exchange não inicializada. Execute connect() antes de publicar.")
 
         try:
-            message_body = json.dumps(payload).encode("utf-8")
-            message = Message(
-                message_body,
-                content_type="application/json",
-                delivery_mode=DeliveryMode.PERSISTENT,
-            )
+            message = self._build_message(payload, trace)
 
+            started = time.perf_counter()
             await self.exchange.publish(message, routing_key="")
-            logger.info(f"📦 Mensagem publicada na fila '{self.queue_name}'")
+            add_stage("publish_ms", elapsed_ms(started), trace)
+            logger.info("📦 Mensagem publicada na fila '%s'", self.queue_name)
 
         except Exception as e:
-            logger.error(f"❌ Erro ao publicar mensagem: {e}")
+            if self.spool:
+                await self._spool_append([payload])
+                annotate(trace, spooled=True)
+                logger.warning("📼 Erro ao publicar (%s) — mensagem guardada no spool", e)
+                return
+            logger.error("❌ Erro ao publicar mensagem: %s", e)
             raise
 
+    async def publish_many(
+        self,
+        payloads: List[Dict],
+        window: int = config.publish_window,
+        traces: Optional[List[Optional[Dict]]] = None,
+    ) -> List[PublishResult]:
+        # Publica vários payloads em pipeline: até `window` mensagens aguardando
+        # confirmação ao mesmo tempo. Retorna um resultado por payload, na mesma ordem.
+        # Com spool habilitado, mensagens não confirmadas vão para o disco (spooled=True), e com
+        # pendências no spool as novas entram atrás delas em vez de ultrapassá-las.
+        # `traces` (opcional, alinhado a `payloads`) segue nos headers e recebe publish_ms.
+        if self.spool and (not self.exchange or self._spool_backlog()):
+            reason = "spool com pendências" if self.exchange else "broker indisponível"
+            await self._spool_append(payloads)
+            logger.warning("📼 %s — %s mensagem(ns) guardadas no spool", reason, len(payloads))
+            return [
+                PublishResult(i, p.get("external_id"), confirmed=False, error=reason, spooled=True)
+                for i, p in enumerate(payloads)
+            ]
+
+        if not self.exchange:
+            raise RuntimeError("Exchange não inicializada. Execute connect() antes de publicar.")
+
+        results = await self._publish_batch(payloads, window, traces)
+
+        failed = [r for r in results if not r.confirmed]
+        if failed:
+            logger.error(
+                "❌ %s/%s mensagem(ns) não confirmadas na fila '%s' (ex: %s)",
+                len(failed), len(results), self.queue_name, failed[0].error
+            )
+            if self.spool:
+                await self._spool_append([payloads[r.index] for r in failed])
+                for r in failed:
+                    r.spooled = True
+                logger.warning("📼 %s mensagem(ns) guardadas no spool", len(failed))
+
+        logger.info(
+            "📦 %s/%s mensagem(ns) confirmadas na fila '%s'",
+            len(results) - len(failed), len(results), self.queue_name
+        )
+        return results
+
+    async def _publish_batch(
+        self, payloads: List[Dict], window: int, traces: Optional[List[Optional[Dict]]] = None
+    ) -> List[PublishResult]:
+        if self.envelope_max_readings > 1:
+            return await self._publish_envelopes(payloads, window, traces)
+
+        semaphore = asyncio.Semaphore(max(1, window))
+
+        async def _publish(index: int, payload: Dict) -> PublishResult:
+            external_id = payload.get("external_id")
+            trace = traces[index] if traces else None
+            async with semaphore:
+                try:
+                    started = time.perf_counter()
+                    await self.exchange.publish(
+                        self._build_message(payload, trace),
+                        routing_key="",
+                        timeout=config.publish_confirm_timeout_seconds,
+                    )
+                    add_stage("publish_ms", elapsed_ms(started), trace)
+                    return PublishResult(index, external_id, confirmed=True)
+                except DeliveryError as e:
+                    return PublishResult(index, external_id, confirmed=False, error=f"nack: {e}")
+                except Exception as e:
+                    return PublishResult(index, external_id, confirmed=False, error=repr(e))
+
+        return list(await asyncio.gather(*(_publish(i, p) for i, p in enumerate(payloads))))
+
+    async def _publish_envelopes(
+        self, payloads: List[Dict], window: int, traces: Optional[List[Optional[Dict]]] = None
+    ) -> List[PublishResult]:
+        # Até `window` envelopes aguardando confirmação; o confirm de um envelope vale
+        # para todas as leituras dele (resultados continuam um por payload, na mesma ordem)
+        semaphore = asyncio.Semaphore(max(1, window))
+        size = self.envelope_max_readings
+        chunks = [range(start, min(start + size, len(payloads))) for start in range(0, len(payloads), size)]
+
+        async def _publish(chunk: range) -> List[PublishResult]:
+            chunk_traces = [traces[i] for i in chunk] if traces else None
+            async with semaphore:
+                try:
+                    started = time.perf_counter()
+                    await self.exchange.publish(
+                        self._build_envelope([payloads[i] for i in chunk], chunk_traces),
+                        routing_key="",
+                        timeout=config.publish_confirm_timeout_seconds,
+                    )
+                    self.envelopes_published += 1
+                    publish_ms = elapsed_ms(started)
+                    for trace in chunk_traces or ():
+                        add_stage("publish_ms", publish_ms, trace)
+                    return [PublishResult(i, payloads[i].get("external_id"), confirmed=True) for i in chunk]
+                except DeliveryError as e:
+                    error = f"nack: {e}"
+                except Exception as e:
+                    error = repr(e)
+            return [
+                PublishResult(i, payloads[i].get("external_id"), confirmed=False, error=error)
+                for i in chunk
+            ]
+
+        results = await asyncio.gather(*(_publish(chunk) for chunk in chunks))
+        return [result for chunk_results in results for result in chunk_results]
+
+    async def _replay_loop(self):
+        # Reenvia o spool em ordem, limitado a SPOOL_REPLAY_RATE mensagens/s
+        rate = max(1.0, config.spool_replay_rate)
+        batch_size = max(1, min(config.publish_window, int(rate)))
+
+        while True:
+            if not self.is_connected or not self.spool.depth:
+                await asyncio.sleep(1.0)
+                continue
+
+            batch = await self._spool_call(self.spool.read_batch, batch_size)
+            if not batch:
+                await asyncio.sleep(1.0)
+                continue
+
+            # O lote sai de uma vez; o que o broker já confirmou numa passada anterior não é reenviado
+            to_send = [i for i, (position, _) in enumerate(batch) if position not in self._replayed_ahead]
+            started = asyncio.get_running_loop().time()
+            results = await self._publish_batch([batch[i][1] for i in to_send], batch_size)
+
+            confirmed_at = [position in self._replayed_ahead for position, _ in batch]
+            errors = {}
+            for i, result in zip(to_send, results):
+                confirmed_at[i] = result.confirmed
+                errors[i] = result.error
+
+            # O cursor só avança até a primeira mensagem não confirmada (preserva a ordem);
+            # as confirmadas depois dela ficam marcadas para a próxima passada
+            confirmed = 0
+            while confirmed < len(batch) and confirmed_at[confirmed]:
+                confirmed += 1
+            for i, (position, _) in enumerate(batch):
+                if i < confirmed:
+                    self._replayed_ahead.discard(position)
+                elif confirmed_at[i]:
+                    self._replayed_ahead.add(position)
+
+            if confirmed:
+                await self._spool_call(self.spool.commit, batch[confirmed - 1][0], confirmed)
+                logger.info(
+                    "📼 Replay do spool: %s mensagem(ns) reenviadas, %s pendente(s)",
+                    confirmed, self.spool.depth
+                )
+
+            if confirmed < len(batch):
+                logger.error("❌ Replay do spool interrompido: %s", errors.get(confirmed))
+                await asyncio.sleep(5.0)
+                continue
+
+            elapsed = asyncio.get_running_loop().time() - started
+            await asyncio.sleep(max(0.0, len(to_send) / rate - elapsed))
+
+    def stats(self) -> Dict:
+        return {
+            "connected": self.is_connected,
+            "envelope": {
+                "max_readings": self.envelope_max_readings,
+                "compression": self.envelope_compression,
+                "published": self.envelopes_published,
+            } if self.envelope_max_readings > 1 else None,
+            "spool": self.spool.stats() if self.spool else None,
+        }
+
     async def close(self):
         # Fecha a conexão com o RabbitMQ
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+
+        if self.spool:
+            await self._spool_call(self.spool.close)
+            self._spool_io.shutdown(wait=True)
+
         try:
             if self.channel and not self.channel.is_closed:
                 await self.channel.close()
@@ -71,4 +388,4 @@ class RabbitMQPublisher:
                 logger.info("🔒 Conexão RabbitMQ encerrada")
 
         except Exception as e:
-            logger.error(f"❌ Erro ao fechar conexão RabbitMQ: {e}")
+            logger.error("❌ Erro ao fechar conexão RabbitMQ: %s", e)
@@ -0,0 +1,186 @@
+import json
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from core.logger import get_logger
+
+logger = get_logger("collector.spool")
+
+# Posição no journal: (número do segmento, offset em bytes)
+SpoolPosition = Tuple[int, int]
+
+
+class DiskSpool:
+    # Journal append-only segmentado (JSON Lines) para guardar payloads enquanto o RabbitMQ está fora
+    SEGMENT_PREFIX = "segment-"
+    SEGMENT_SUFFIX = ".jsonl"
+
+    def __init__(self, directory: str, segment_max_bytes: int = 16 * 1024 * 1024):
+        self.directory = directory
+        self.segment_max_bytes = max(1024, segment_max_bytes)
+        self._cursor_path = os.path.join(directory, "cursor.json")
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._cursor: SpoolPosition = self._load_cursor()
+        segments = self._list_segments()
+        self._write_segment = segments[-1] if segments else max(1, self._cursor[0])
+        self._writer = None
+
+        self.depth = self._count_pending(segments)
+        self.appended_total = 0
+        self.replayed_total = 0
+        self._replayed_window: Deque[Tuple[float, int]] = deque()
+
+        if self.depth:
+            logger.warning("📼 Spool com %s mensagem(ns) pendente(s) em %s", self.depth, directory)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{self.SEGMENT_PREFIX}{segment:08d}{self.SEGMENT_SUFFIX}")
+
+    def _list_segments(self) -> List[int]:
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.SEGMENT_SUFFIX):
+                try:
+                    segments.append(int(name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(s for s in segments if s >= self._cursor[0])
+
+    def _load_cursor(self) -> SpoolPosition:
+        try:
+            with open(self._cursor_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return int(data["segment"]), int(data["offset"])
+        except FileNotFoundError:
+            return 1, 0
+        except (ValueError, KeyError, OSError) as e:
+            logger.error("❌ Cursor do spool inválido (%s). Reiniciando do primeiro segmento", e)
+            return 1, 0
+
+    def _save_cursor(self):
+        tmp_path = self._cursor_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"segment": self._cursor[0], "offset": self._cursor[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._cursor_path)
+
+    def _count_pending(self, segments: List[int]) -> int:
+        pending = 0
+        for segment in segments:
+            with open(self._segment_path(segment), "rb") as f:
+                if segment == self._cursor[0]:
+                    f.seek(self._cursor[1])
+                pending += sum(1 for line in f if line.strip())
+        return pending
+
+    def append_many(self, payloads: List[Dict]):
+        # Grava os payloads no fim do journal (um fsync por chamada)
+        if not payloads:
+            return
+
+        if self._writer is None:
+            self._writer = open(self._segment_path(self._write_segment), "ab")
+
+        for payload in payloads:
+            self._writer.write(json.dumps(payload).encode("utf-8") + b"\n")
+
+        self._writer.flush()
+        os.fsync(self._writer.fileno())
+
+        self.depth += len(payloads)
+        self.appended_total += len(payloads)
+
+        if self._writer.tell() >= self.segment_max_bytes:
+            self._writer.close()
+            self._writer = None
+            self._write_segment += 1
+
+    def append(self, payload: Dict):
+        self.append_many([payload])
+
+    def read_batch(self, limit: int) -> List[Tuple[SpoolPosition, Dict]]:
+        # Lê até `limit` payloads a partir do cursor, em ordem, sem consumi-los.
+        # Cada item traz a posição logo após ele, para ser usada em commit().
+        batch: List[Tuple[SpoolPosition, Dict]] = []
+        segment, offset = self._cursor
+
+        while len(batch) < limit and segment <= self._write_segment:
+            path = self._segment_path(segment)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    while len(batch) < limit:
+                        line = f.readline()
+                        if not line or not line.endswith(b"\n"):
+                            break
+                        offset = f.tell()
+                        if not line.strip():
+                            continue
+                        try:
+                            batch.append(((segment, offset), json.loads(line)))
+                        except ValueError:
+                            logger.error("❌ Linha corrompida no spool ignorada (segmento %s)", segment)
+
+            if len(batch) >= limit or segment == self._write_segment:
+                break
+            segment, offset = segment + 1, 0
+
+        return batch
+
+    def commit(self, position: SpoolPosition, count: int):
+        # Avança o cursor até `position` e remove segmentos totalmente consumidos
+        old_segment = self._cursor[0]
+        self.depth = max(0, self.depth - count)
+
+        if self.depth == 0:
+            # Spool vazio: começa um segmento novo e descarta todos os anteriores
+            self.close()
+            self._write_segment += 1
+            position = (self._write_segment, 0)
+
+        self._cursor = position
+        self._save_cursor()
+
+        for segment in range(old_segment, position[0]):
+            try:
+                os.remove(self._segment_path(segment))
+            except FileNotFoundError:
+                pass
+
+        self.replayed_total += count
+        self._replayed_window.append((time.monotonic(), count))
+
+    def replay_rate(self, window_seconds: float = 60.0) -> float:
+        now = time.monotonic()
+        while self._replayed_window and self._replayed_window[0][0] < now - window_seconds:
+            self._replayed_window.popleft()
+        return sum(count for _, count in self._replayed_window) / window_seconds
+
+    def stats(self) -> Dict:
+        return {
+            "depth": self.depth,
+            "appended_total": self.appended_total,
+            "replayed_total": self.replayed_total,
+            "replay_rate_per_second": round(self.replay_rate(), 3),
+            "segments": len(self._list_segments()),
+        }
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def open_spool(directory: Optional[str], segment_max_bytes: int) -> Optional[DiskSpool]:
+    if not directory:
+        return None
+    try:
+        return DiskSpool(directory, segment_max_bytes)
+    except OSError as e:
+        logger.error("❌ Spool em disco indisponível (%s): %s", directory, e)
+        return None
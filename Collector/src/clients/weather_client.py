@@ -1,9 +1,19 @@
+import asyncio
+import importlib.util
+import time
+import httpx
+from core.config import config
 from core.logger import get_logger
-from typing import Optional
+from core.tracing import add_stage, annotate, elapsed_ms
+from domain.state import normalize_city_key
+from typing import Dict, List, Optional
 
+from utils.fetch_cache import GridFetchCache
+from utils.forecast_buffer import HourlyForecastBuffer
 from utils.weather_utils import (
     resolve_city_to_coords,
-    fetch_weather,
+    fetch_weather_batch,
+    fetch_hourly_batch,
     build_payload,
     WeatherClientError
 )
@@ -12,32 +22,172 @@ logger = get_logger("collector.weather_client")
 
 
 class WeatherClient:
-    def __init__(self, timeout: int = 10):
+    def __init__(self, timeout: float = config.http_timeout_seconds):
         self.timeout = timeout
+        self.http: Optional[httpx.AsyncClient] = None
+        self.fetch_cache = GridFetchCache(
+            resolution_deg=config.fetch_grid_resolution_deg,
+            ttl_seconds=config.fetch_cache_ttl_seconds,
+        )
+        # Modo "hourly": previsão das próximas horas servida de memória a cada ciclo
+        self.hourly_mode = config.collect_mode == "hourly"
+        self.forecast_buffer = HourlyForecastBuffer()
+        # Cidade (chave normalizada) -> célula da última coleta, para liberar a célula na remoção
+        self._city_cells: Dict[str, tuple] = {}
 
-    async def fetch_weather_by_city(self, city: str) -> Optional[dict]:
-        try:
-            logger.info(f"🔎 Resolvendo coordenadas para cidade: {city}")
-            coords = await resolve_city_to_coords(city)
+    async def start(self):
+        # Cria o cliente HTTP compartilhado (pool de conexões reaproveitado entre coletas)
+        if self.http is not None:
+            return
 
-            lat = coords["lat"]
-            lon = coords["lon"]
-            resolved_city = coords["city"]
-            logger.info(f"📍 Coordenadas encontradas: {lat}, {lon} ({resolved_city})")
+        http2 = config.http2_enabled
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("⚠ HTTP2_ENABLED=true, mas o pacote 'h2' não está instalado. Usando HTTP/1.1")
+            http2 = False
 
-            weather_data = await fetch_weather(lat, lon)
-            payload = build_payload(weather_data, lat, lon, resolved_city)
-            logger.info("📦 Payload final pronto")
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(
+                max_connections=config.http_max_connections,
+                max_keepalive_connections=config.http_max_keepalive_connections,
+                keepalive_expiry=config.http_keepalive_expiry_seconds,
+            ),
+            http2=http2,
+        )
+        logger.info(
+            "🌐 Cliente HTTP iniciado — timeout %ss, max_connections %s, http2=%s",
+            self.timeout, config.http_max_connections, http2
+        )
 
-            return payload
+    async def close(self):
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
+            logger.info("🔒 Cliente HTTP encerrado")
 
-        except WeatherClientError as e:
-            logger.error(f"Erro ao coletar dados para a cidade '{city}': {e}")
-            return None
+    def _client(self) -> httpx.AsyncClient:
+        if self.http is None:
+            raise RuntimeError("Cliente HTTP não inicializado. Execute start() antes de coletar.")
+        return self.http
 
-        except Exception as e:
-            logger.error(f"Erro inesperado ao processar a cidade '{city}': {e}")
-            logger.error("TRACEBACK COMPLETO:")
-            import traceback
-            logger.error(traceback.format_exc())
-            return None
+    def forget(self, city: str):
+        # Cidade removida: descarta a leitura/série da célula dela, se nenhuma outra cidade a usa
+        cell = self._city_cells.pop(normalize_city_key(city), None)
+        if cell is not None and cell not in self._city_cells.values():
+            self.forecast_buffer.remove(cell)
+            self.fetch_cache.remove(cell)
+
+    def _cached_reading(self, cell) -> Optional[Dict]:
+        if self.hourly_mode:
+            return self.forecast_buffer.reading(cell)
+        return self.fetch_cache.get(cell)
+
+    async def _fetch_cells(self, cells: List) -> List[Optional[Dict]]:
+        # Busca uma leitura por célula [(célula, coords)] e guarda no cache/buffer do modo atual
+        client = self._client()
+        coords = [(c["lat"], c["lon"]) for _, c in cells]
+
+        if self.hourly_mode:
+            series_list = await fetch_hourly_batch(coords, config.forecast_hours, client)
+            readings = []
+            for (cell, _), series in zip(cells, series_list):
+                if series is not None:
+                    self.forecast_buffer.put(cell, series)
+                readings.append(self.forecast_buffer.reading(cell, count=False) if series is not None else None)
+            return readings
+
+        readings = await fetch_weather_batch(coords, client)
+        for (cell, _), weather_data in zip(cells, readings):
+            if weather_data is not None:
+                self.fetch_cache.put(cell, weather_data)
+        return readings
+
+    async def fetch_weather_by_cities(
+        self, cities: List[str], traces: Optional[Dict[str, Dict]] = None
+    ) -> Dict[str, dict]:
+        # Coleta várias cidades agrupando as coordenadas em lotes de FORECAST_BATCH_SIZE.
+        # Cidades na mesma célula da grade (FETCH_GRID_RESOLUTION_DEG) compartilham a leitura;
+        # no modo "hourly" só as células com a série horária vencida vão à API.
+        # Retorna {cidade: payload}; cidades com falha ficam de fora.
+        # `traces` (opcional, por cidade) recebe as etapas geocode_ms e fetch_ms.
+        client = self._client()
+        semaphore = asyncio.Semaphore(max(1, config.collect_concurrency))
+        traces = traces or {}
+
+        async def _resolve(city: str) -> Optional[Dict]:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    return await resolve_city_to_coords(city, client)
+                except WeatherClientError as e:
+                    logger.error("Erro ao resolver a cidade '%s': %s", city, e)
+                    return None
+                finally:
+                    add_stage("geocode_ms", elapsed_ms(started), traces.get(city))
+
+        resolved = await asyncio.gather(*(_resolve(city) for city in cities))
+        targets = [(city, coords) for city, coords in zip(cities, resolved) if coords]
+
+        # Agrupa cidades por célula da grade: uma única leitura por célula
+        cities_by_cell: Dict[tuple, List] = {}
+        for city, coords in targets:
+            cell = self.fetch_cache.cell(coords["lat"], coords["lon"])
+            cities_by_cell.setdefault(cell, []).append((city, coords))
+            self._city_cells[normalize_city_key(city)] = cell
+
+        readings_by_cell: Dict[tuple, Dict] = {}
+        fetch_ms_by_cell: Dict[tuple, float] = {}
+        cached_cells = set()
+        to_fetch = []
+        for cell, members in cities_by_cell.items():
+            cached = self._cached_reading(cell)
+            if cached is not None:
+                readings_by_cell[cell] = cached
+                cached_cells.add(cell)
+            else:
+                # A primeira cidade da célula representa as demais na requisição
+                to_fetch.append((cell, members[0][1]))
+
+        self.fetch_cache.record_shared(len(targets) - len(cities_by_cell))
+
+        batch_size = max(1, config.forecast_batch_size)
+        batches = [to_fetch[i:i + batch_size] for i in range(0, len(to_fetch), batch_size)]
+
+        async def _fetch(batch) -> List[Optional[Dict]]:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    return await self._fetch_cells(batch)
+                except WeatherClientError as e:
+                    logger.error("Erro ao coletar lote de %s célula(s): %s", len(batch), e)
+                    return [None] * len(batch)
+                finally:
+                    # Todas as células do lote compartilham a mesma requisição
+                    for cell, _ in batch:
+                        fetch_ms_by_cell[cell] = elapsed_ms(started)
+
+        readings = await asyncio.gather(*(_fetch(batch) for batch in batches))
+
+        for batch, batch_readings in zip(batches, readings):
+            for (cell, _), weather_data in zip(batch, batch_readings):
+                if weather_data is not None:
+                    readings_by_cell[cell] = weather_data
+
+        payloads: Dict[str, dict] = {}
+        for cell, members in cities_by_cell.items():
+            weather_data = readings_by_cell.get(cell)
+            if weather_data is None:
+                continue
+            for city, coords in members:
+                payloads[city] = build_payload(
+                    weather_data, coords["lat"], coords["lon"], coords["city"]
+                )
+                if city in traces:
+                    add_stage("fetch_ms", fetch_ms_by_cell.get(cell, 0.0), traces[city])
+                    annotate(traces[city], fetch_cached=cell in cached_cells)
+
+        logger.info(
+            "📦 %s/%s payload(s) prontos em %s requisição(ões) de previsão",
+            len(payloads), len(cities), len(batches)
+        )
+        return payloads
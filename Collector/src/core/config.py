@@ -18,7 +18,71 @@ class AppConfig:
     )
     raw_exchange: str = os.getenv("RAW_EXCHANGE") or _get_env("RAW_QUEUE", "weather.raw")
     raw_queue: str = _get_env("RAW_QUEUE", "weather.raw")
+    publish_window: int = int(_get_env("PUBLISH_WINDOW", "100"))
+    publish_confirm_timeout_seconds: float = float(_get_env("PUBLISH_CONFIRM_TIMEOUT_SECONDS", "30"))
+    # Envelope: até N leituras por mensagem AMQP (0/1 = uma mensagem por leitura) e compressão
+    envelope_max_readings: int = int(_get_env("ENVELOPE_MAX_READINGS", "0"))
+    envelope_compression: str = _get_env("ENVELOPE_COMPRESSION", "none").lower()
+
+    # Spool local em disco para quando o RabbitMQ estiver fora (vazio = desabilitado)
+    spool_dir: str = _get_env("SPOOL_DIR", "")
+    spool_segment_max_bytes: int = int(_get_env("SPOOL_SEGMENT_MAX_BYTES", str(16 * 1024 * 1024)))
+    spool_replay_rate: float = float(_get_env("SPOOL_REPLAY_RATE", "200"))
     collect_interval_seconds: int = int(_get_env("COLLECT_INTERVAL_SECONDS", "3600"))
+    collect_concurrency: int = int(_get_env("COLLECT_CONCURRENCY", "20"))
+    forecast_batch_size: int = int(_get_env("FORECAST_BATCH_SIZE", "50"))
+
+    # "current": consulta o bloco current a cada ciclo; "hourly": pré-busca FORECAST_HOURS horas
+    collect_mode: str = _get_env("COLLECT_MODE", "current").lower()
+    forecast_hours: int = int(_get_env("FORECAST_HOURS", "24"))
+
+    # Deduplicação por célula da grade, opt-in (0 = desabilitado). Com 0.1, cidades a ~11 km
+    # umas das outras passam a compartilhar a mesma leitura
+    fetch_grid_resolution_deg: float = float(_get_env("FETCH_GRID_RESOLUTION_DEG", "0"))
+    fetch_cache_ttl_seconds: int = int(_get_env("FETCH_CACHE_TTL_SECONDS", "600"))
+
+    # Detecção de mudança: não publica leituras iguais à última (dentro da tolerância)
+    change_detection_enabled: bool = _get_env("CHANGE_DETECTION_ENABLED", "false").lower() == "true"
+    change_tolerance_temperature: float = float(_get_env("CHANGE_TOLERANCE_TEMPERATURE", "0.5"))
+    change_tolerance_humidity: float = float(_get_env("CHANGE_TOLERANCE_HUMIDITY", "2"))
+    change_tolerance_wind_speed: float = float(_get_env("CHANGE_TOLERANCE_WIND_SPEED", "1"))
+    change_tolerance_precipitation: float = float(_get_env("CHANGE_TOLERANCE_PRECIPITATION", "0.1"))
+    change_heartbeat_seconds: int = int(_get_env("CHANGE_HEARTBEAT_SECONDS", "10800"))
+
+    # Histórico recente por cidade em memória (ring buffer de tamanho fixo); 0 desabilita
+    history_capacity: int = int(_get_env("HISTORY_CAPACITY", "168"))
+    history_max_cities: int = int(_get_env("HISTORY_MAX_CITIES", "10000"))
+
+    # Cache de geocoding (coordenadas de cidade não mudam)
+    geocode_cache_ttl_seconds: int = int(_get_env("GEOCODE_CACHE_TTL_SECONDS", "2592000"))
+    geocode_cache_negative_ttl_seconds: int = int(
+        _get_env("GEOCODE_CACHE_NEGATIVE_TTL_SECONDS", "3600")
+    )
+    geocode_cache_max_entries: int = int(_get_env("GEOCODE_CACHE_MAX_ENTRIES", "50000"))
+    geocode_cache_path: str = _get_env("GEOCODE_CACHE_PATH", "")
+
+    # Gazetteer offline (arquivo de cidades do GeoNames), consultado antes da API de geocoding.
+    # O índice é gerado ao lado do arquivo (ou em GAZETTEER_INDEX_PATH) e refeito se o arquivo mudar.
+    gazetteer_path: str = _get_env("GAZETTEER_PATH", "")
+    gazetteer_index_path: str = _get_env("GAZETTEER_INDEX_PATH", "")
+
+    # Cliente HTTP compartilhado (Open-Meteo)
+    http_timeout_seconds: float = float(_get_env("HTTP_TIMEOUT_SECONDS", "10"))
+    http_max_connections: int = int(_get_env("HTTP_MAX_CONNECTIONS", "100"))
+    http_max_keepalive_connections: int = int(_get_env("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    http_keepalive_expiry_seconds: float = float(_get_env("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+    http2_enabled: bool = _get_env("HTTP2_ENABLED", "false").lower() == "true"
+    http_retries: int = int(_get_env("HTTP_RETRIES", "3"))
+    http_backoff_seconds: float = float(_get_env("HTTP_BACKOFF_SECONDS", "0.5"))
+
+    # Traces por mensagem (etapas e latências) mantidos em memória; 0 desabilita
+    trace_store_max_entries: int = int(_get_env("TRACE_STORE_MAX_ENTRIES", "10000"))
+
+    # Logging: "sync" (direto no stdout) ou "queue" (formatação/escrita numa thread, fila limitada)
+    log_mode: str = _get_env("LOG_MODE", "sync").lower()
+    log_queue_size: int = int(_get_env("LOG_QUEUE_SIZE", "10000"))
+    # Amostragem de INFO por logger, ex: "collector.scheduler=0.1,collector.rabbitmq=0.1"
+    log_sampling: str = _get_env("LOG_SAMPLING", "")
 
 
 config = AppConfig()
@@ -0,0 +1,61 @@
+import gzip
+import json
+from typing import Dict, List, Optional, Tuple
+
+# Envelope: várias leituras numa única mensagem AMQP (Collector → IA-Service).
+# Mensagens sem esse content-type continuam sendo uma leitura JSON cada.
+ENVELOPE_CONTENT_TYPE = "application/vnd.weather-envelope+json"
+ENVELOPE_VERSION_HEADER = "x-envelope-version"
+ENVELOPE_VERSION = 1
+
+COMPRESSIONS = ("none", "gzip")
+
+
+class EnvelopeError(ValueError):
+    pass
+
+
+def encode_envelope(
+    payloads: List[Dict], traces: Optional[List[Optional[Dict]]] = None, compression: str = "none"
+) -> Tuple[bytes, Optional[str]]:
+    # Retorna (corpo, content-encoding). `traces` (alinhado a `payloads`) leva os
+    # headers x-trace-* de cada leitura, já que os headers AMQP são da mensagem inteira
+    envelope = {"version": ENVELOPE_VERSION, "readings": payloads}
+    if traces and any(traces):
+        envelope["traces"] = traces
+
+    body = json.dumps(envelope, separators=(",", ":")).encode("utf-8")
+    if compression == "gzip":
+        return gzip.compress(body, compresslevel=6), "gzip"
+    return body, None
+
+
+def is_envelope(content_type: Optional[str]) -> bool:
+    return content_type == ENVELOPE_CONTENT_TYPE
+
+
+def decode_envelope(
+    body: bytes, content_encoding: Optional[str] = None, version=None
+) -> List[Tuple[Dict, Optional[Dict]]]:
+    # Retorna [(leitura, headers de trace | None)]
+    if version is not None and int(version) > ENVELOPE_VERSION:
+        raise EnvelopeError(f"Versão de envelope não suportada: {version}")
+
+    if content_encoding not in (None, "", "identity", "gzip"):
+        raise EnvelopeError(f"Content-encoding não suportado: {content_encoding}")
+
+    try:
+        if content_encoding == "gzip":
+            body = gzip.decompress(body)
+        envelope = json.loads(body)
+    except (OSError, EOFError, ValueError) as e:
+        raise EnvelopeError(f"Envelope inválido: {e}") from e
+
+    readings = envelope.get("readings") if isinstance(envelope, dict) else None
+    if not isinstance(readings, list):
+        raise EnvelopeError("Envelope sem a lista 'readings'")
+
+    traces = envelope.get("traces") or [None] * len(readings)
+    if len(traces) != len(readings):
+        raise EnvelopeError("Envelope com 'traces' desalinhado de 'readings'")
+    return list(zip(readings, traces))
@@ -1,14 +1,35 @@
+import atexit
 import logging
 import json
+import queue
 import sys
-from datetime import datetime
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from core.config import config
 
 
 class JSONFormatter(logging.Formatter):
     # Padrão JSON do logging
+    def __init__(self):
+        super().__init__()
+        # (segundo, "AAAA-MM-DDTHH:MM:SS") do último record: só a fração muda entre logs
+        # do mesmo segundo, então o prefixo formatado é reaproveitado
+        self._second = (None, "")
+
+    def _timestamp(self, created: float) -> str:
+        second = int(created)
+        cached, prefix = self._second
+        if cached != second:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+            self._second = (second, prefix)
+        return "%s.%06dZ" % (prefix, (created - second) * 1e6)
+
     def format(self, record):
         log_record = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            # Instante do evento (não da formatação, que pode ocorrer depois na thread de log)
+            "timestamp": self._timestamp(record.created),
             "level": record.levelname,
             "logger": record.name,
             "filename": record.filename,
@@ -19,6 +40,86 @@ class JSONFormatter(logging.Formatter):
         return json.dumps(log_record)
 
 
+class DroppingQueueHandler(QueueHandler):
+    # Enfileira o record cru: formatação e escrita ficam na thread do QueueListener.
+    # Fila cheia descarta (e conta) em vez de bloquear o event loop.
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BoundedQueueListener(QueueListener):
+    # stop() padrão usa put_nowait no sentinela e falha com a fila cheia;
+    # aqui ele espera a thread abrir espaço, garantindo o flush no encerramento
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class SamplingFilter(logging.Filter):
+    # Mantém 1 a cada N records de nível <= INFO; WARNING e acima passam sempre
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._seen = 0
+        self.sampled_out = 0
+
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+
+        self._seen += 1
+        if self.every and (self._seen - 1) % self.every == 0:
+            return True
+
+        self.sampled_out += 1
+        return False
+
+
+def _parse_sampling(spec: str) -> Dict[str, float]:
+    # "ia.consumer=0.1,ia.publisher=0.5" -> {"ia.consumer": 0.1, "ia.publisher": 0.5}
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+_SAMPLING = _parse_sampling(config.log_sampling)
+_samplers: Dict[str, SamplingFilter] = {}
+_queue_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+def _stream_handler() -> logging.Handler:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JSONFormatter())
+    return handler
+
+
+def _shared_queue_handler() -> DroppingQueueHandler:
+    global _queue_handler, _listener
+
+    if _queue_handler is None:
+        log_queue = queue.Queue(maxsize=max(1, config.log_queue_size))
+        _queue_handler = DroppingQueueHandler(log_queue)
+        _listener = BoundedQueueListener(log_queue, _stream_handler())
+        _listener.start()
+        # Esvazia a fila ao encerrar o processo
+        atexit.register(_listener.stop)
+
+    return _queue_handler
+
+
 def get_logger(name: str = __name__, level=logging.INFO) -> logging.Logger:
     logger = logging.getLogger(name)
 
@@ -28,8 +129,24 @@ def get_logger(name: str = __name__, level=logging.INFO) -> logging.Logger:
 
     logger.setLevel(level)
 
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(JSONFormatter())
+    if config.log_mode == "queue":
+        handler = _shared_queue_handler()
+    else:
+        handler = _stream_handler()
+
+    rate = _SAMPLING.get(name)
+    if rate is not None and rate < 1:
+        _samplers[name] = SamplingFilter(rate)
+        logger.addFilter(_samplers[name])
 
     logger.addHandler(handler)
     return logger
+
+
+def logging_stats() -> Dict:
+    return {
+        "mode": "queue" if _queue_handler is not None else "sync",
+        "queued": _queue_handler.queue.qsize() if _queue_handler is not None else 0,
+        "dropped": _queue_handler.dropped if _queue_handler is not None else 0,
+        "sampled_out": {name: sampler.sampled_out for name, sampler in _samplers.items()},
+    }
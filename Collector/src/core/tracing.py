@@ -0,0 +1,82 @@
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, List, Optional
+
+from core.config import config
+
+# Headers AMQP do trace (Collector → IA-Service → Worker)
+TRACE_ID_HEADER = "x-trace-id"
+TRACE_STARTED_AT_HEADER = "x-trace-started-at"
+TRACE_PUBLISHED_AT_HEADER = "x-trace-published-at"
+TRACE_STAGES_HEADER = "x-trace-stages"
+
+def elapsed_ms(started: float) -> float:
+    # `started` vem de time.perf_counter()
+    return round((time.perf_counter() - started) * 1000, 3)
+
+
+def new_trace(trace_id: str, service: str, **fields) -> Dict:
+    return {
+        "trace_id": trace_id,
+        "service": service,
+        "started_at": time.time(),
+        "stages": {},
+        **fields,
+    }
+
+
+def add_stage(name: str, value_ms: float, trace: Optional[Dict]):
+    # Etapas prefixadas pelo serviço ("collector.publish_ms"), para não colidirem
+    # com as do IA-Service no header x-trace-stages
+    if trace is not None:
+        trace["stages"][f"{trace['service']}.{name}"] = value_ms
+
+
+def annotate(trace: Optional[Dict], **fields):
+    if trace is not None:
+        trace.update(fields)
+
+
+def trace_headers(trace: Dict) -> Dict:
+    # Propaga o trace: id, início e etapas concluídas até aqui
+    return {
+        TRACE_ID_HEADER: trace["trace_id"],
+        TRACE_STARTED_AT_HEADER: trace.get("origin_started_at", trace["started_at"]),
+        TRACE_PUBLISHED_AT_HEADER: time.time(),
+        TRACE_STAGES_HEADER: {**trace.get("upstream", {}), **trace["stages"]},
+    }
+
+
+class TraceStore:
+    # Últimos traces concluídos (LRU limitado), consultáveis por trace_id
+    def __init__(self, max_entries: int):
+        self.max_entries = max(0, max_entries)
+        self._traces: "OrderedDict[str, Dict]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def record(self, trace: Dict):
+        if not self.enabled:
+            return
+
+        trace["total_ms"] = round((time.time() - trace["started_at"]) * 1000, 3)
+        self._traces[trace["trace_id"]] = trace
+        self._traces.move_to_end(trace["trace_id"])
+
+        while len(self._traces) > self.max_entries:
+            self._traces.popitem(last=False)
+
+    def get(self, trace_id: str) -> Optional[Dict]:
+        return self._traces.get(trace_id)
+
+    def recent(self, limit: int = 50) -> List[Dict]:
+        return list(islice(reversed(self._traces.values()), max(0, limit)))
+
+    def __len__(self) -> int:
+        return len(self._traces)
+
+
+trace_store = TraceStore(config.trace_store_max_entries)
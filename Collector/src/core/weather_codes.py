@@ -0,0 +1,46 @@
+from typing import Optional
+
+# Códigos WMO do Open-Meteo → rótulo de condição publicado pelo Collector.
+# Arquivo idêntico em Collector/src/core e IA-Service/src/core (o IA-Service pré-compila
+# as regras a partir destes rótulos); benchmarks/bench_rule_engine.py falha se divergirem.
+WEATHER_CODE_MAP = {
+    0: "céu limpo",
+    1: "principalmente claro",
+    2: "parcialmente nublado",
+    3: "nublado",
+    45: "neblina",
+    48: "neblina gelada",
+    51: "chuvisco leve",
+    53: "chuvisco moderado",
+    55: "chuvisco intenso",
+    56: "chuvisco congelante leve",
+    57: "chuvisco congelante intenso",
+    61: "chuva leve",
+    63: "chuva moderada",
+    65: "chuva forte",
+    66: "chuva congelante leve",
+    67: "chuva congelante intensa",
+    71: "neve leve",
+    73: "neve moderada",
+    75: "neve forte",
+    77: "granizo de neve",
+    80: "aguaceiros leves",
+    81: "aguaceiros moderados",
+    82: "aguaceiros intensos",
+    85: "nevasca leve",
+    86: "nevasca intensa",
+    95: "trovoada",
+    96: "trovoada com granizo leve",
+    99: "trovoada com granizo forte",
+}
+
+UNKNOWN_CONDITION = "desconhecido"
+
+# Todos os rótulos que o Collector pode emitir (exceto o fallback "codigo_<n>")
+CONDITIONS = tuple(dict.fromkeys(WEATHER_CODE_MAP.values())) + (UNKNOWN_CONDITION,)
+
+
+def map_condition(code: Optional[int]) -> str:
+    if code is None:
+        return UNKNOWN_CONDITION
+    return WEATHER_CODE_MAP.get(code, f"codigo_{code}")
@@ -0,0 +1,84 @@
+import time
+from typing import Dict, Optional, Tuple
+
+from core.config import config
+from domain.state import normalize_city_key
+
+# Campos numéricos comparados com tolerância (a condição é comparada por igualdade)
+NUMERIC_FIELDS = ("temperature", "humidity", "wind_speed", "precipitation_mm")
+
+# Fingerprint compacto: (valores numéricos..., condição, publicado_em)
+Fingerprint = Tuple[Optional[float], Optional[float], Optional[float], Optional[float], str, float]
+
+
+class ChangeDetector:
+    # Suprime leituras sem mudança relevante em relação à última publicada de cada cidade
+    def __init__(self, tolerances: Dict[str, float], heartbeat_seconds: float, enabled: bool = True):
+        self.tolerances = tuple(tolerances.get(field, 0.0) for field in NUMERIC_FIELDS)
+        self.heartbeat_seconds = heartbeat_seconds
+        self.enabled = enabled
+
+        self._last: Dict[str, Fingerprint] = {}
+        self.suppressed = 0
+        self.passed = 0
+
+    @staticmethod
+    def _values(payload: Dict) -> Tuple:
+        return tuple(payload.get(field) for field in NUMERIC_FIELDS) + (payload.get("condition") or "",)
+
+    def has_changed(self, city: str, payload: Dict) -> bool:
+        if not self.enabled:
+            return True
+
+        last = self._last.get(normalize_city_key(city))
+        if last is None or time.time() - last[-1] >= self.heartbeat_seconds:
+            return True
+
+        values = self._values(payload)
+        if values[-1] != last[-2]:
+            return True
+
+        for new, old, tolerance in zip(values, last, self.tolerances):
+            if new is None or old is None:
+                if new is not old:
+                    return True
+            elif abs(new - old) > tolerance:
+                return True
+
+        return False
+
+    def filter(self, payloads: Dict[str, Dict]) -> Dict[str, Dict]:
+        # Mantém só as leituras que mudaram (ou venceram o heartbeat) e contabiliza as suprimidas
+        changed = {city: payload for city, payload in payloads.items() if self.has_changed(city, payload)}
+        self.suppressed += len(payloads) - len(changed)
+        self.passed += len(changed)
+        return changed
+
+    def mark_published(self, city: str, payload: Dict):
+        if self.enabled:
+            self._last[normalize_city_key(city)] = self._values(payload) + (time.time(),)
+
+    def forget(self, city: str):
+        self._last.pop(normalize_city_key(city), None)
+
+    def stats(self) -> Dict:
+        total = self.suppressed + self.passed
+        return {
+            "enabled": self.enabled,
+            "tracked_cities": len(self._last),
+            "suppressed": self.suppressed,
+            "passed": self.passed,
+            "suppression_rate": round(self.suppressed / total, 4) if total else 0.0,
+        }
+
+
+change_detector = ChangeDetector(
+    tolerances={
+        "temperature": config.change_tolerance_temperature,
+        "humidity": config.change_tolerance_humidity,
+        "wind_speed": config.change_tolerance_wind_speed,
+        "precipitation_mm": config.change_tolerance_precipitation,
+    },
+    heartbeat_seconds=config.change_heartbeat_seconds,
+    enabled=config.change_detection_enabled,
+)
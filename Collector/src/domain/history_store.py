@@ -0,0 +1,211 @@
+import math
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+from core.config import config
+from domain.state import normalize_city_key
+
+# Métricas guardadas por leitura (valores ausentes viram NaN no buffer)
+HISTORY_FIELDS = ("temperature", "humidity", "wind_speed", "precipitation_mm")
+
+NAN = float("nan")
+
+
+def _value(value) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+class CityHistory:
+    # Ring buffer de capacidade fixa: um array('d') de horários e um por métrica.
+    # Memória por cidade ~ capacidade × (1 + len(HISTORY_FIELDS)) × 8 bytes.
+    __slots__ = ("capacity", "times", "values", "start", "size")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.values = {field: array("d", bytes(8 * capacity)) for field in HISTORY_FIELDS}
+        # Posição da leitura mais antiga e quantidade de leituras válidas
+        self.start = 0
+        self.size = 0
+
+    def _slot(self, position: int) -> int:
+        # position 0 = mais antiga
+        return (self.start + position) % self.capacity
+
+    def append(self, timestamp: float, payload: Dict) -> bool:
+        # Horários só avançam: leitura repetida (mesmo horário) substitui a última,
+        # leitura mais antiga que a última é ignorada
+        if self.size:
+            last = self._slot(self.size - 1)
+            if timestamp < self.times[last]:
+                return False
+            if timestamp == self.times[last]:
+                self._write(last, timestamp, payload)
+                return True
+
+        if self.size < self.capacity:
+            slot = self._slot(self.size)
+            self.size += 1
+        else:
+            # Cheio: sobrescreve a mais antiga
+            slot = self.start
+            self.start = (self.start + 1) % self.capacity
+
+        self._write(slot, timestamp, payload)
+        return True
+
+    def _write(self, slot: int, timestamp: float, payload: Dict):
+        self.times[slot] = timestamp
+        for field in HISTORY_FIELDS:
+            value = payload.get(field)
+            self.values[field][slot] = NAN if value is None else float(value)
+
+    def _bisect(self, timestamp: float, right: bool = False) -> int:
+        # Posição cronológica de `timestamp` (busca binária sobre o ring buffer)
+        low, high = 0, self.size
+        while low < high:
+            mid = (low + high) // 2
+            value = self.times[self._slot(mid)]
+            if value < timestamp or (right and value == timestamp):
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def slots(self, since: float, until: float) -> List[int]:
+        # Índices no buffer das leituras em [since, until], em ordem cronológica
+        return [
+            self._slot(position)
+            for position in range(self._bisect(since), self._bisect(until, right=True))
+        ]
+
+    def first_time(self) -> Optional[float]:
+        return self.times[self.start] if self.size else None
+
+    def last_time(self) -> Optional[float]:
+        return self.times[self._slot(self.size - 1)] if self.size else None
+
+
+class HistoryStore:
+    # Histórico recente por cidade, para dashboards consultarem sem ir ao banco do backend
+    def __init__(self, capacity: int, max_cities: int):
+        self.capacity = max(0, capacity)
+        self.max_cities = max(1, max_cities)
+        self._cities: Dict[str, CityHistory] = {}
+
+        self.appended = 0
+        self.ignored = 0
+        self.evicted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def put(self, city: str, payload: Dict):
+        if not self.enabled:
+            return
+
+        key = normalize_city_key(city)
+        history = self._cities.get(key)
+        if history is None:
+            if len(self._cities) >= self.max_cities:
+                self._cities.pop(next(iter(self._cities)))
+                self.evicted += 1
+            history = self._cities[key] = CityHistory(self.capacity)
+
+        timestamp = payload.get("timestamp") or time.time()
+        if history.append(float(timestamp), payload):
+            self.appended += 1
+        else:
+            self.ignored += 1
+
+    def remove(self, city: str):
+        self._cities.pop(normalize_city_key(city), None)
+
+    def query(
+        self,
+        city: str,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        buckets: Optional[int] = None,
+        fields: Sequence[str] = HISTORY_FIELDS,
+    ) -> Optional[Dict]:
+        # Leituras em [since, until]; com `buckets`, agrega em intervalos de mesma
+        # largura com min/max/média por métrica (NaN fica de fora da agregação)
+        history = self._cities.get(normalize_city_key(city))
+        if history is None:
+            return None
+
+        since = history.first_time() if since is None else since
+        until = history.last_time() if until is None else until
+        result = {"city": city, "since": since, "until": until, "fields": list(fields)}
+
+        if since is None or until is None or until < since:
+            result.update(count=0, points=[])
+            return result
+
+        slots = history.slots(since, until)
+        result["count"] = len(slots)
+
+        if not buckets:
+            result["points"] = [
+                {"t": history.times[slot], **{field: _value(history.values[field][slot]) for field in fields}}
+                for slot in slots
+            ]
+            return result
+
+        result["buckets"] = self._downsample(history, slots, since, until, buckets, fields)
+        return result
+
+    @staticmethod
+    def _downsample(
+        history: CityHistory, slots: List[int], since: float, until: float, buckets: int, fields: Sequence[str]
+    ) -> List[Dict]:
+        width = max((until - since) / buckets, 1e-9)
+        # Por bucket e métrica: [quantidade, soma, mínimo, máximo]
+        acc = [{field: [0, 0.0, math.inf, -math.inf] for field in fields} for _ in range(buckets)]
+        counts = [0] * buckets
+
+        for slot in slots:
+            index = min(int((history.times[slot] - since) / width), buckets - 1)
+            counts[index] += 1
+            for field in fields:
+                value = history.values[field][slot]
+                if math.isnan(value):
+                    continue
+                entry = acc[index][field]
+                entry[0] += 1
+                entry[1] += value
+                if value < entry[2]:
+                    entry[2] = value
+                if value > entry[3]:
+                    entry[3] = value
+
+        result = []
+        for index in range(buckets):
+            if not counts[index]:
+                continue
+            bucket = {"t": since + index * width, "count": counts[index]}
+            for field in fields:
+                n, total, low, high = acc[index][field]
+                bucket[field] = (
+                    {"min": low, "max": high, "mean": round(total / n, 3)} if n else None
+                )
+            result.append(bucket)
+        return result
+
+    def stats(self) -> Dict:
+        per_city = self.capacity * (1 + len(HISTORY_FIELDS)) * 8
+        return {
+            "enabled": self.enabled,
+            "cities": len(self._cities),
+            "capacity": self.capacity,
+            "appended": self.appended,
+            "ignored": self.ignored,
+            "evicted": self.evicted,
+            "buffer_bytes": per_city * len(self._cities),
+        }
+
+
+history_store = HistoryStore(config.history_capacity, config.history_max_cities)
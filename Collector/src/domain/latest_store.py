@@ -0,0 +1,52 @@
+import hashlib
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from domain.state import normalize_city_key
+
+
+class LatestReadingStore:
+    # Última leitura coletada por cidade, já serializada, para leitura sem lock.
+    # Escritas trocam a entrada inteira de uma vez (atômico no event loop).
+    def __init__(self):
+        # chave normalizada -> (corpo JSON, etag)
+        self._entries: Dict[str, Tuple[bytes, str]] = {}
+
+    def put(self, city: str, payload: Dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        etag = f'"{payload.get("external_id") or hashlib.sha1(body).hexdigest()}"'
+        self._entries[normalize_city_key(city)] = (body, etag)
+
+    def get(self, city: str) -> Optional[Tuple[bytes, str]]:
+        return self._entries.get(normalize_city_key(city))
+
+    def get_many(self, cities: Iterable[str]) -> Tuple[bytes, str]:
+        # Monta {"readings": {...}, "missing": [...]} reaproveitando os corpos já serializados
+        parts: List[bytes] = []
+        etags: List[str] = []
+        missing: List[str] = []
+
+        for city in cities:
+            entry = self._entries.get(normalize_city_key(city))
+            if entry is None:
+                missing.append(city)
+                continue
+            body, etag = entry
+            parts.append(json.dumps(city, ensure_ascii=False).encode("utf-8") + b":" + body)
+            etags.append(etag)
+
+        body = (
+            b'{"readings":{' + b",".join(parts) + b'},"missing":'
+            + json.dumps(missing, ensure_ascii=False).encode("utf-8") + b"}"
+        )
+        digest = hashlib.sha1("|".join(etags + ["missing"] + missing).encode("utf-8")).hexdigest()
+        return body, f'"{digest}"'
+
+    def remove(self, city: str):
+        self._entries.pop(normalize_city_key(city), None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+latest_store = LatestReadingStore()
@@ -1,28 +1,67 @@
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Set
 from asyncio import Lock, Event
 
 
+def normalize_city_key(city: str) -> str:
+    # Chave canônica da cidade (evita duplicar "São Paulo" e "são paulo ")
+    return " ".join(city.strip().split()).casefold()
+
+
 class CollectorState:
+    # Registro de cidades acompanhadas pelo Collector
     def __init__(self):
-        self.city: Optional[str] = None
+        self.cities: Dict[str, str] = {}
+        self.pending: Set[str] = set()
         self.lock = Lock()
-        self.city_changed = Event()
+        self.cities_changed = Event()
+
+    async def add_city(self, city: str) -> bool:
+        key = normalize_city_key(city)
+        async with self.lock:
+            if key in self.cities:
+                return False
+
+            self.cities[key] = city.strip()
+            self.pending.add(key)
+            self.cities_changed.set()
+            return True
+
+    async def remove_city(self, city: str) -> bool:
+        key = normalize_city_key(city)
+        async with self.lock:
+            if self.cities.pop(key, None) is None:
+                return False
+
+            self.pending.discard(key)
+            return True
 
     async def set_city(self, city: str):
+        # Compatibilidade com o antigo POST /city: registra a cidade
+        await self.add_city(city)
+
+    async def list_cities(self) -> List[str]:
+        async with self.lock:
+            return list(self.cities.values())
+
+    async def get_city(self, city: str) -> Optional[str]:
         async with self.lock:
-            old_city = self.city
-            self.city = city
-            
-            if old_city != city:
-                self.city_changed.set()  
+            return self.cities.get(normalize_city_key(city))
 
-    async def get_city(self) -> Optional[str]:
+    async def registered(self, cities: Iterable[str]) -> Set[str]:
+        # Quais destas cidades continuam registradas (DELETE /cities pode ocorrer durante um ciclo)
         async with self.lock:
-            return self.city
-    
+            return {city for city in cities if normalize_city_key(city) in self.cities}
+
+    async def take_pending(self) -> List[str]:
+        # Retorna (e limpa) as cidades registradas desde a última coleta
+        async with self.lock:
+            pending = [self.cities[key] for key in self.pending if key in self.cities]
+            self.pending.clear()
+            return pending
+
     async def wait_for_city_change(self):
-        await self.city_changed.wait()
-        self.city_changed.clear()
+        await self.cities_changed.wait()
+        self.cities_changed.clear()
 
 
 state = CollectorState()
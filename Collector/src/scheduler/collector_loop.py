@@ -1,56 +1,139 @@
 import asyncio
+from typing import List
 from domain.state import state
+from domain.change_detector import change_detector
+from domain.latest_store import latest_store
+from domain.history_store import history_store
 from core.logger import get_logger
 from core.config import config
+from core.tracing import annotate, new_trace, trace_store
 from clients.weather_client import WeatherClient
 from clients.rabbitmq_client import RabbitMQPublisher
+from clients.spool import open_spool
 
 logger = get_logger("collector.scheduler")
 
+weather = WeatherClient()
+rabbit = RabbitMQPublisher(
+    amqp_url=config.rabbit_url,
+    exchange=config.raw_exchange,
+    queue=config.raw_queue,
+    spool=open_spool(config.spool_dir, config.spool_segment_max_bytes),
+    envelope_max_readings=config.envelope_max_readings,
+    envelope_compression=config.envelope_compression,
+)
 
-async def collect_once(weather: WeatherClient, rabbit: RabbitMQPublisher, city: str):
-    logger.info(f"📡 Coletando clima para: {city}")
-    payload = await weather.fetch_weather_by_city(city)
 
-    if payload:
-        await rabbit.publish(payload)
-        logger.info(f"✔ Payload publicado para RabbitMQ ({city})")
+async def collect_many(weather: WeatherClient, rabbit: RabbitMQPublisher, cities: List[str]):
+    # Coleta várias cidades em lotes e publica em pipeline com publisher confirms
+    logger.info("📡 Coletando clima para %s cidade(s)", len(cities))
+    traces = {city: new_trace("", "collector", city=city) for city in cities}
+    collected = await weather.fetch_weather_by_cities(cities, traces)
+
+    # Cidades removidas (DELETE /cities) durante a coleta não voltam para os stores nem são publicadas
+    registered = await state.registered(collected)
+    for city in collected.keys() - registered:
+        weather.forget(city)
+        annotate(traces[city], trace_id=collected[city]["external_id"], published=False, removed=True)
+        trace_store.record(traces[city])
+    collected = {city: payload for city, payload in collected.items() if city in registered}
+
+    for city, payload in collected.items():
+        latest_store.put(city, payload)
+        history_store.put(city, payload)
+        traces[city]["trace_id"] = payload["external_id"]
+
+    payloads = change_detector.filter(collected)
+    if len(payloads) < len(collected):
+        logger.info("💤 %s leitura(s) sem mudança relevante suprimidas", len(collected) - len(payloads))
+        for city in collected.keys() - payloads.keys():
+            annotate(traces[city], published=False)
+            trace_store.record(traces[city])
+
+    if not payloads:
+        return
+
+    try:
+        results = await rabbit.publish_many(
+            list(payloads.values()), traces=[traces[city] for city in payloads]
+        )
+    except Exception as e:
+        logger.error("❌ Falha ao publicar %s payload(s): %s", len(payloads), e)
+        # Os traces do lote também registram a falha
+        for city in payloads:
+            annotate(traces[city], published=False, error=repr(e))
+            trace_store.record(traces[city])
+        return
+
+    cities_by_index = list(payloads.keys())
+    # Removida enquanto publicava: não recria o estado do change detector
+    registered = await state.registered(payloads)
+
+    for result in results:
+        city = cities_by_index[result.index]
+        annotate(traces[city], published=result.confirmed, spooled=result.spooled, error=result.error)
+        trace_store.record(traces[city])
+        if result.confirmed or result.spooled:
+            if city in registered:
+                change_detector.mark_published(city, payloads[city])
+        else:
+            logger.error("❌ Falha ao publicar a cidade '%s': %s", city, result.error)
 
 
 async def run_collector_loop():
-    weather = WeatherClient()
-    rabbit = RabbitMQPublisher(
-        amqp_url=config.rabbit_url,
-        exchange=config.raw_exchange,
-        queue=config.raw_queue,
-    )
-    await rabbit.connect()
+    await weather.start()
+    # Conexão com o RabbitMQ em segundo plano: o Collector sobe mesmo com o broker fora
+    await rabbit.start()
+
+    try:
+        await _run_cycles(weather, rabbit)
+    finally:
+        await weather.close()
+        await rabbit.close()
 
-    logger.info(f"🚀 Collector iniciado — intervalo {config.collect_interval_seconds}s")
 
+async def _run_cycles(weather: WeatherClient, rabbit: RabbitMQPublisher):
+    logger.info(
+        "🚀 Collector iniciado — intervalo %ss, concorrência %s",
+        config.collect_interval_seconds, config.collect_concurrency
+    )
+
+    loop = asyncio.get_running_loop()
     warned_no_city = False
+    next_cycle = loop.time()
 
     while True:
-        city = await state.get_city()
+        cities = await state.list_cities()
 
-        if not city:
+        if not cities:
             if not warned_no_city:
-                logger.warning("⚠ Nenhuma cidade definida. Aguardando POST /city...")
+                logger.warning("⚠ Nenhuma cidade registrada. Aguardando POST /cities...")
                 warned_no_city = True
-            
+
             await state.wait_for_city_change()
             continue
         if warned_no_city:
-            logger.info(f"📌 Cidade recebida -> {city}. Coleta iniciada.")
+            logger.info("📌 %s cidade(s) registrada(s). Coleta iniciada.", len(cities))
             warned_no_city = False
 
-        await collect_once(weather, rabbit, city)
+        if loop.time() >= next_cycle:
+            # Ciclo completo: todas as cidades registradas
+            await state.take_pending()
+            started = loop.time()
+            await collect_many(weather, rabbit, cities)
+            logger.info("🔁 Ciclo concluído — %s cidade(s) em %.2fs", len(cities), loop.time() - started)
+            next_cycle = started + config.collect_interval_seconds
+        else:
+            # Cidades novas são coletadas imediatamente, sem esperar o ciclo
+            pending = await state.take_pending()
+            if pending:
+                await collect_many(weather, rabbit, pending)
 
         try:
             await asyncio.wait_for(
                 state.wait_for_city_change(),
-                timeout=config.collect_interval_seconds
+                timeout=max(0.0, next_cycle - loop.time())
             )
-            logger.info("🔄 Cidade alterada! Coletando dados da nova cidade imediatamente...")
+            logger.info("🔄 Nova cidade registrada! Coletando imediatamente...")
         except asyncio.TimeoutError:
-            pass
\ No newline at end of file
+            pass
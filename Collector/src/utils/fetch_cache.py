@@ -0,0 +1,76 @@
+import time
+from typing import Dict, Optional, Tuple
+
+# Célula da grade: coordenadas quantizadas pela resolução configurada
+Cell = Tuple[int, int]
+
+
+class GridFetchCache:
+    # Compartilha leituras entre cidades que caem na mesma célula da grade do modelo
+    def __init__(self, resolution_deg: float, ttl_seconds: float, max_entries: int = 100_000):
+        self.resolution_deg = resolution_deg
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+
+        # célula -> (expira_em, leitura)
+        self._entries: Dict[Cell, Tuple[float, Dict]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.resolution_deg > 0
+
+    def cell(self, lat: float, lon: float) -> Cell:
+        if not self.enabled:
+            # Sem grade: cada coordenada exata é sua própria célula
+            return (round(lat * 1e6), round(lon * 1e6))
+        return (round(lat / self.resolution_deg), round(lon / self.resolution_deg))
+
+    def get(self, cell: Cell) -> Optional[Dict]:
+        if not self.enabled or self.ttl_seconds <= 0:
+            return None
+
+        entry = self._entries.get(cell)
+        if entry is None or entry[0] <= time.time():
+            self._entries.pop(cell, None)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry[1]
+
+    def put(self, cell: Cell, reading: Dict):
+        if not self.enabled or self.ttl_seconds <= 0:
+            return
+
+        if len(self._entries) >= self.max_entries:
+            self._purge_expired()
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+
+        self._entries[cell] = (time.time() + self.ttl_seconds, reading)
+
+    def remove(self, cell: Cell):
+        self._entries.pop(cell, None)
+
+    def record_shared(self, count: int):
+        # Cidades extras atendidas pela mesma requisição dentro de um ciclo
+        self.shared += count
+
+    def _purge_expired(self):
+        now = time.time()
+        for cell in [c for c, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[cell]
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "resolution_deg": self.resolution_deg,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_in_cycle": self.shared,
+        }
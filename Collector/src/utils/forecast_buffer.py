@@ -0,0 +1,70 @@
+import time
+from bisect import bisect_right
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+Cell = Tuple[int, int]
+
+# Campos da série horária no mesmo formato da leitura "current"
+SERIES_FIELDS = ("temperature", "humidity", "wind_speed", "weather_code", "precipitation_mm")
+HOUR_SECONDS = 3600
+
+
+class HourlyForecastBuffer:
+    # Guarda a previsão horária das próximas N horas por célula e responde
+    # cada ciclo de coleta a partir dela, até a série acabar
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max(1, max_entries)
+        # célula -> (horários unix, {campo: valores})
+        self._series: Dict[Cell, Tuple[List[float], Dict[str, List]]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def reading(self, cell: Cell, now: Optional[float] = None, count: bool = True) -> Optional[Dict]:
+        # Leitura da hora corrente; None se a série não cobre `now` (precisa renovar).
+        # count=False não contabiliza hit/miss (leitura logo após a renovação).
+        entry = self._series.get(cell)
+        now = time.time() if now is None else now
+
+        if entry is not None:
+            times, values = entry
+            index = bisect_right(times, now) - 1
+            if 0 <= index and now < times[index] + HOUR_SECONDS:
+                self.hits += count
+                reading = {
+                    field: values[field][index] if index < len(values[field]) else None
+                    for field in SERIES_FIELDS
+                }
+                reading["timestamp"] = datetime.now(timezone.utc).timestamp()
+                return reading
+
+            self._series.pop(cell, None)
+
+        self.misses += count
+        return None
+
+    def put(self, cell: Cell, series: Dict):
+        times = series.get("time") or []
+        if not times:
+            return
+
+        if cell not in self._series and len(self._series) >= self.max_entries:
+            self._series.pop(next(iter(self._series)))
+
+        self._series[cell] = (list(times), {field: list(series.get(field) or []) for field in SERIES_FIELDS})
+        self.refreshes += 1
+
+    def remove(self, cell: Cell):
+        self._series.pop(cell, None)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._series),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
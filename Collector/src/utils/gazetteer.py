@@ -0,0 +1,206 @@
+import mmap
+import os
+import struct
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from core.logger import get_logger
+from domain.state import normalize_city_key
+
+logger = get_logger("collector.gazetteer")
+
+# Índice em disco: cabeçalho | offsets uint32 (um por registro) | registros UTF-8 ordenados pela chave.
+# Registro: chave \t nome \t lat \t lon \t país \t população \n
+MAGIC = b"GZT1"
+HEADER = struct.Struct("<4sII")  # magic, quantidade de registros, início dos registros
+
+# Colunas do arquivo GeoNames (cities500.txt, cities15000.txt, ...)
+COL_NAME, COL_ASCII, COL_LAT, COL_LON, COL_COUNTRY, COL_POPULATION = 1, 2, 4, 5, 8, 14
+
+# Limite de registros varridos numa busca por prefixo (antes de ordenar por população)
+MAX_PREFIX_SCAN = 1000
+
+
+def fold_city_name(name: str) -> str:
+    # Chave do índice: normalize_city_key sem acentos ("São Paulo" → "sao paulo")
+    decomposed = unicodedata.normalize("NFKD", normalize_city_key(name))
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def build_index(source: str, target: str) -> int:
+    # Lê o TSV do GeoNames e grava o índice ordenado (arquivo temporário + rename atômico).
+    # Cada cidade entra pelo nome e pelo nome ASCII; chaves iguais ficam por população decrescente.
+    rows: List[Tuple[str, int, bytes]] = []
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) <= COL_POPULATION:
+                continue
+            try:
+                lat, lon = float(cols[COL_LAT]), float(cols[COL_LON])
+                population = int(cols[COL_POPULATION] or 0)
+            except ValueError:
+                continue
+
+            name = cols[COL_NAME]
+            for key in {fold_city_name(name), fold_city_name(cols[COL_ASCII] or name)}:
+                if key and "\t" not in key:
+                    record = f"{key}\t{name}\t{lat}\t{lon}\t{cols[COL_COUNTRY]}\t{population}\n"
+                    rows.append((key, -population, record.encode("utf-8")))
+
+    rows.sort(key=lambda row: (row[0], row[1]))
+
+    records_start = HEADER.size + 4 * len(rows)
+    tmp = f"{target}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(rows), records_start))
+        offset = records_start
+        offsets = bytearray()
+        for _, _, record in rows:
+            offsets += struct.pack("<I", offset)
+            offset += len(record)
+        f.write(offsets)
+        for _, _, record in rows:
+            f.write(record)
+    os.replace(tmp, target)
+    return len(rows)
+
+
+class Gazetteer:
+    # Resolução offline de cidades: busca binária num índice mapeado em memória (mmap),
+    # sem carregar os registros no heap. Consultado antes da API de geocoding.
+    def __init__(self, source: str = "", index_path: str = ""):
+        self.source = source or None
+        self.index_path = index_path or (f"{source}.idx" if source else None)
+        self._file = None
+        self._mm: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+        self._offsets: Optional[memoryview] = None
+        self.count = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        if self.source:
+            self._open()
+
+    @property
+    def enabled(self) -> bool:
+        return self._mm is not None
+
+    def _open(self):
+        try:
+            stale = (
+                not os.path.exists(self.index_path)
+                or os.path.getmtime(self.index_path) < os.path.getmtime(self.source)
+            )
+            if stale:
+                started = time.perf_counter()
+                count = build_index(self.source, self.index_path)
+                logger.info(
+                    "🗺 Índice do gazetteer gerado: %s nome(s) em %.1fs → %s",
+                    count, time.perf_counter() - started, self.index_path
+                )
+
+            self._file = open(self.index_path, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self.count, records_start = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC:
+                raise ValueError(f"arquivo não é um índice do gazetteer ({magic!r})")
+            self._view = memoryview(self._mm)
+            self._offsets = self._view[HEADER.size:records_start].cast("I")
+            logger.info("🗺 Gazetteer carregado: %s nome(s) (%s)", self.count, self.index_path)
+        except (OSError, ValueError) as e:
+            logger.error("❌ Gazetteer indisponível (%s): %s. Usando só a API de geocoding", self.source, e)
+            self.close()
+
+    def _record(self, index: int) -> Tuple[bytes, int]:
+        # (chave, início do registro)
+        start = self._offsets[index]
+        return self._mm[start:self._mm.find(b"\t", start)], start
+
+    def _lower_bound(self, key: bytes) -> int:
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self._record(mid)[0] < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def _parse(self, start: int) -> Dict:
+        end = self._mm.find(b"\n", start)
+        _, name, lat, lon, country, population = self._mm[start:end].decode("utf-8").split("\t")
+        return {
+            "lat": float(lat),
+            "lon": float(lon),
+            "city": name,
+            "country": country,
+            "population": int(population),
+        }
+
+    def lookup(self, city: str) -> Optional[Dict]:
+        # Nome exato (normalizado, sem acentos); entre homônimos, a cidade mais populosa
+        if not self.enabled:
+            return None
+
+        key = fold_city_name(city).encode("utf-8")
+        index = self._lower_bound(key)
+        if index < self.count:
+            found, start = self._record(index)
+            if found == key:
+                self.hits += 1
+                coords = self._parse(start)
+                return {"lat": coords["lat"], "lon": coords["lon"], "city": coords["city"]}
+
+        self.misses += 1
+        return None
+
+    def search(self, prefix: str, limit: int = 10) -> List[Dict]:
+        # Nomes que começam com `prefix`, mais populosos primeiro (autocomplete)
+        if not self.enabled:
+            return []
+
+        key = fold_city_name(prefix).encode("utf-8")
+        if not key:
+            return []
+
+        # A mesma cidade pode aparecer pelo nome e pelo nome ASCII ("koln"/"koeln")
+        matches: Dict[Tuple, Dict] = {}
+        index = self._lower_bound(key)
+        scanned = 0
+        while index < self.count and scanned < MAX_PREFIX_SCAN:
+            found, start = self._record(index)
+            if not found.startswith(key):
+                break
+            match = self._parse(start)
+            matches.setdefault((match["city"], match["lat"], match["lon"]), match)
+            index += 1
+            scanned += 1
+
+        return sorted(matches.values(), key=lambda match: -match["population"])[:max(0, limit)]
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "names": self.count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self):
+        # As views precisam ser liberadas antes de fechar o mmap
+        for view in (self._offsets, self._view):
+            if view is not None:
+                view.release()
+        self._offsets = self._view = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,144 @@
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from core.logger import get_logger
+from domain.state import normalize_city_key
+
+logger = get_logger("collector.geocoding_cache")
+
+# Marcador de cache negativo (cidade inexistente na API de geocoding)
+NOT_FOUND = object()
+
+
+class GeocodingCache:
+    # Cache LRU com TTL para coordenadas de cidades, com persistência opcional em SQLite
+    def __init__(
+        self,
+        ttl_seconds: float,
+        negative_ttl_seconds: float,
+        max_entries: int,
+        path: Optional[str] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.path = path or None
+
+        # chave -> (expira_em, coords | None)
+        self._entries: "OrderedDict[str, Tuple[float, Optional[Dict]]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.path:
+            self._open_db()
+
+    def _open_db(self):
+        try:
+            self._db = sqlite3.connect(self.path, isolation_level=None)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS geocoding ("
+                " key TEXT PRIMARY KEY, expires_at REAL NOT NULL, coords TEXT)"
+            )
+            self._load_from_db()
+        except sqlite3.Error as e:
+            logger.error("❌ Cache de geocoding em disco indisponível (%s): %s", self.path, e)
+            self._db = None
+
+    def _load_from_db(self):
+        now = time.time()
+        self._db.execute("DELETE FROM geocoding WHERE expires_at <= ?", (now,))
+        rows = self._db.execute(
+            "SELECT key, expires_at, coords FROM geocoding ORDER BY expires_at DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+
+        for key, expires_at, coords in reversed(rows):
+            self._entries[key] = (expires_at, json.loads(coords) if coords else None)
+
+        logger.info("💾 Cache de geocoding carregado do disco: %s entrada(s)", len(rows))
+
+    def get(self, city: str):
+        # Retorna coords, NOT_FOUND (cache negativo) ou None (miss)
+        key = normalize_city_key(city)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, coords = entry
+        if expires_at <= time.time():
+            self._delete(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        if coords is None:
+            self.negative_hits += 1
+            return NOT_FOUND
+
+        self.hits += 1
+        return coords
+
+    def set(self, city: str, coords: Dict):
+        self._store(normalize_city_key(city), coords, self.ttl_seconds)
+
+    def set_not_found(self, city: str):
+        self._store(normalize_city_key(city), None, self.negative_ttl_seconds)
+
+    def _store(self, key: str, coords: Optional[Dict], ttl: float):
+        if ttl <= 0:
+            return
+
+        expires_at = time.time() + ttl
+        self._entries[key] = (expires_at, coords)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self._delete_from_db(old_key)
+            self.evictions += 1
+
+        if self._db:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO geocoding (key, expires_at, coords) VALUES (?, ?, ?)",
+                    (key, expires_at, json.dumps(coords) if coords else None),
+                )
+            except sqlite3.Error as e:
+                logger.error("❌ Falha ao persistir geocoding de '%s': %s", key, e)
+
+    def _delete(self, key: str):
+        self._entries.pop(key, None)
+        self._delete_from_db(key)
+
+    def _delete_from_db(self, key: str):
+        if self._db:
+            try:
+                self._db.execute("DELETE FROM geocoding WHERE key = ?", (key,))
+            except sqlite3.Error as e:
+                logger.error("❌ Falha ao remover geocoding de '%s': %s", key, e)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+            "persistent": self._db is not None,
+        }
+
+    def close(self):
+        if self._db:
+            self._db.close()
+            self._db = None
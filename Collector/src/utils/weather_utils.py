@@ -1,122 +1,228 @@
+import asyncio
+import random
 import uuid
+from core.config import config
 from core.logger import get_logger
+from core.weather_codes import map_condition
+from utils.gazetteer import Gazetteer
+from utils.geocoding_cache import GeocodingCache, NOT_FOUND
 import httpx
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timezone
 import traceback
 
 logger = get_logger("collector.weather")
 
-WEATHER_CODE_MAP = {
-    0: "céu limpo",
-    1: "principalmente claro",
-    2: "parcialmente nublado",
-    3: "nublado",
-    45: "neblina",
-    48: "neblina gelada",
-    51: "chuvisco leve",
-    53: "chuvisco moderado",
-    55: "chuvisco intenso",
-    56: "chuvisco congelante leve",
-    57: "chuvisco congelante intenso",
-    61: "chuva leve",
-    63: "chuva moderada",
-    65: "chuva forte",
-    66: "chuva congelante leve",
-    67: "chuva congelante intensa",
-    71: "neve leve",
-    73: "neve moderada",
-    75: "neve forte",
-    77: "granizo de neve",
-    80: "aguaceiros leves",
-    81: "aguaceiros moderados",
-    82: "aguaceiros intensos",
-    85: "nevasca leve",
-    86: "nevasca intensa",
-    95: "trovoada",
-    96: "trovoada com granizo leve",
-    99: "trovoada com granizo forte",
-}
-
 
 class WeatherClientError(Exception):
     """Exceção customizada para erros no client de weather"""
     pass
 
 
-async def resolve_city_to_coords(city: str) -> Dict:
+class CityNotFoundError(WeatherClientError):
+    """A API de geocoding não conhece a cidade informada"""
+    pass
+
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    # Respeita Retry-After quando enviado; senão backoff exponencial com jitter completo
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, config.http_backoff_seconds * (2 ** attempt))
+
+
+async def get_json(client: httpx.AsyncClient, url: str, params: Dict) -> Dict:
+    # GET com retries para erros de rede e status transitórios (429/5xx)
+    retries = max(0, config.http_retries)
+
+    for attempt in range(retries + 1):
+        try:
+            r = await client.get(url, params=params)
+        except httpx.TransportError as e:
+            if attempt >= retries:
+                raise
+            delay = _backoff_delay(attempt)
+            logger.warning("🔁 Erro de rede em %s (%r) — nova tentativa em %.2fs", url, e, delay)
+            await asyncio.sleep(delay)
+            continue
+
+        if r.status_code in RETRY_STATUS_CODES and attempt < retries:
+            delay = _backoff_delay(attempt, r.headers.get("Retry-After"))
+            logger.warning("🔁 %s respondeu %s — nova tentativa em %.2fs", url, r.status_code, delay)
+            await asyncio.sleep(delay)
+            continue
+
+        r.raise_for_status()  # Levanta exceção se status != 2xx
+        return r.json()
+
+
+geocoding_cache = GeocodingCache(
+    ttl_seconds=config.geocode_cache_ttl_seconds,
+    negative_ttl_seconds=config.geocode_cache_negative_ttl_seconds,
+    max_entries=config.geocode_cache_max_entries,
+    path=config.geocode_cache_path,
+)
+
+gazetteer = Gazetteer(config.gazetteer_path, config.gazetteer_index_path)
+
+
+async def resolve_city_to_coords(city: str, client: httpx.AsyncClient) -> Dict:
+    # Gazetteer local primeiro (sem rede); a API de geocoding só resolve o que ele não conhece
+    coords = gazetteer.lookup(city)
+    if coords is not None:
+        return coords
+
+    cached = geocoding_cache.get(city)
+    if cached is NOT_FOUND:
+        raise CityNotFoundError(f"Nenhum resultado encontrado para cidade='{city}' (cache)")
+    if cached is not None:
+        return cached
+
     try:
         url = "https://geocoding-api.open-meteo.com/v1/search"
-        params = {"name": city, "count": 10, "language": "pt", "format": "json"}
-
-        async with httpx.AsyncClient() as client:
-            r = await client.get(url, params=params, timeout=10)
-            r.raise_for_status()  # Levanta exceção se status != 2xx
+        # Só o primeiro resultado é usado
+        params = {"name": city, "count": 1, "language": "pt", "format": "json"}
 
-        data = r.json()
+        data = await get_json(client, url, params)
 
         if not data.get("results"):
             msg = f"Nenhum resultado encontrado para cidade='{city}'"
             logger.warning(msg)
-            raise WeatherClientError(msg)
+            geocoding_cache.set_not_found(city)
+            raise CityNotFoundError(msg)
 
         item = data["results"][0]
 
-        return {
+        coords = {
             "lat": item["latitude"],
             "lon": item["longitude"],
             "city": item.get("name", city),
         }
+        geocoding_cache.set(city, coords)
+        return coords
+
+    except CityNotFoundError:
+        raise
 
     except Exception as e:
-        logger.error(f"Erro ao resolver cidade '{city}': {e}")
+        logger.error("Erro ao resolver cidade '%s': %s", city, e)
         logger.error("TRACEBACK COMPLETO:")
         logger.error(traceback.format_exc())
         raise WeatherClientError(f"Falha ao resolver cidade '{city}': {e}") from e
 
 
-async def fetch_weather(lat: float, lon: float) -> Dict:
-    try:
-        url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            "current": "temperature_2m,relative_humidity_2m,wind_speed_10m,weather_code,precipitation",
-            "timezone": "UTC",
-        }
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+CURRENT_FIELDS = "temperature_2m,relative_humidity_2m,wind_speed_10m,weather_code,precipitation"
 
-        async with httpx.AsyncClient() as client:
-            r = await client.get(url, params=params, timeout=10)
-            r.raise_for_status()
 
-        data = r.json()
-        current = data.get("current", {})
+def _parse_current(current: Dict) -> Dict:
+    return {
+        "temperature": current.get("temperature_2m"),
+        "humidity": current.get("relative_humidity_2m"),
+        "wind_speed": current.get("wind_speed_10m"),
+        "weather_code": current.get("weather_code"),
+        "precipitation_mm": current.get("precipitation"),
+        "timestamp": datetime.now(timezone.utc).timestamp(),
+    }
 
-        if not current:
-            msg = f"Nenhum dado de clima retornado para lat={lat}, lon={lon}"
-            logger.warning(msg)
-            raise WeatherClientError(msg)
-
-        return {
-            "temperature": current.get("temperature_2m"),
-            "humidity": current.get("relative_humidity_2m"),
-            "wind_speed": current.get("wind_speed_10m"),
-            "weather_code": current.get("weather_code"),
-            "precipitation_mm": current.get("precipitation"),
-            "timestamp": datetime.now(timezone.utc).timestamp(),
-        }
+
+async def _fetch_locations(
+    coords: List[Tuple[float, float]], params: Dict, client: httpx.AsyncClient
+) -> List[Dict]:
+    # Uma única requisição para várias coordenadas (latitude/longitude separadas por vírgula).
+    # Retorna o objeto de cada localização, na mesma ordem das coordenadas.
+    params = {
+        "latitude": ",".join(str(lat) for lat, _ in coords),
+        "longitude": ",".join(str(lon) for _, lon in coords),
+        "timezone": "UTC",
+        **params,
+    }
+
+    data = await get_json(client, FORECAST_URL, params)
+    locations = data if isinstance(data, list) else [data]
+
+    if len(locations) != len(coords):
+        raise WeatherClientError(
+            f"Resposta em lote com {len(locations)} localizações para {len(coords)} coordenadas"
+        )
+
+    return locations
+
+
+async def fetch_weather_batch(
+    coords: List[Tuple[float, float]], client: httpx.AsyncClient
+) -> List[Optional[Dict]]:
+    # Leitura "current" de várias coordenadas; None quando a API não trouxe "current"
+    if not coords:
+        return []
+
+    try:
+        locations = await _fetch_locations(coords, {"current": CURRENT_FIELDS}, client)
+
+        readings: List[Optional[Dict]] = []
+        for (lat, lon), location in zip(coords, locations):
+            current = location.get("current") or {}
+            if not current:
+                logger.warning("Nenhum dado de clima retornado para lat=%s, lon=%s", lat, lon)
+                readings.append(None)
+                continue
+            readings.append(_parse_current(current))
+
+        return readings
 
     except Exception as e:
-        logger.error(f"Erro ao coletar dados de lat={lat}, lon={lon}: {e}")
+        logger.error("Erro ao coletar lote de %s coordenadas: %s", len(coords), e)
         logger.error("TRACEBACK COMPLETO:")
         logger.error(traceback.format_exc())
-        raise WeatherClientError(f"Falha ao coletar clima para lat={lat}, lon={lon}: {e}") from e
+        raise WeatherClientError(f"Falha ao coletar clima em lote ({len(coords)} coordenadas): {e}") from e
+
 
+async def fetch_hourly_batch(
+    coords: List[Tuple[float, float]], hours: int, client: httpx.AsyncClient
+) -> List[Optional[Dict]]:
+    # Série horária das próximas `hours` horas para várias coordenadas.
+    # Cada série: {"time": [unix...], "temperature": [...], ...}; None quando a API não trouxe "hourly".
+    if not coords:
+        return []
 
-def map_condition(code: Optional[int]) -> str:
-    if code is None:
-        return "desconhecido"
-    return WEATHER_CODE_MAP.get(code, f"codigo_{code}")
+    try:
+        locations = await _fetch_locations(
+            coords,
+            {"hourly": CURRENT_FIELDS, "forecast_hours": hours, "timeformat": "unixtime"},
+            client,
+        )
+
+        series_list: List[Optional[Dict]] = []
+        for (lat, lon), location in zip(coords, locations):
+            hourly = location.get("hourly") or {}
+            if not hourly.get("time"):
+                logger.warning("Nenhuma previsão horária retornada para lat=%s, lon=%s", lat, lon)
+                series_list.append(None)
+                continue
+            series_list.append({
+                "time": hourly.get("time"),
+                "temperature": hourly.get("temperature_2m"),
+                "humidity": hourly.get("relative_humidity_2m"),
+                "wind_speed": hourly.get("wind_speed_10m"),
+                "weather_code": hourly.get("weather_code"),
+                "precipitation_mm": hourly.get("precipitation"),
+            })
+
+        return series_list
+
+    except Exception as e:
+        logger.error("Erro ao coletar previsão horária de %s coordenadas: %s", len(coords), e)
+        logger.error("TRACEBACK COMPLETO:")
+        logger.error(traceback.format_exc())
+        raise WeatherClientError(
+            f"Falha ao coletar previsão horária em lote ({len(coords)} coordenadas): {e}"
+        ) from e
 
 
 def build_payload(data: Dict, lat: float, lon: float, city: str) -> Dict:
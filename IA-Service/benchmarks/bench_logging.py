@@ -0,0 +1,116 @@
+"""Benchmark de logging: formatter síncrono original vs. modo fila (core/logger.py).
+
+Mede o custo pago por quem chama o logger (o event loop) e o tempo total até tudo
+ser escrito. Cada variante escreve num arquivo temporário, como o stdout de um container.
+
+Uso (a partir de IA-Service/):
+    python benchmarks/bench_logging.py [--records 50000]
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from core.logger import BoundedQueueListener, DroppingQueueHandler, JSONFormatter, SamplingFilter  # noqa: E402
+
+
+class OriginalJSONFormatter(logging.Formatter):
+    # Formatter anterior, para comparação
+    def format(self, record):
+        log_record = {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "filename": record.filename,
+            "function": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        return json.dumps(log_record)
+
+
+def _file_handler(path: str, formatter: logging.Formatter) -> logging.Handler:
+    handler = logging.StreamHandler(open(path, "w", buffering=8192))
+    handler.setFormatter(formatter)
+    return handler
+
+
+def _logger(name: str, handler: logging.Handler, sampling: float = 1.0) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.handlers.clear()
+    logger.filters.clear()
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    if sampling < 1:
+        logger.addFilter(SamplingFilter(sampling))
+    return logger
+
+
+def _run(records: int, log_call) -> float:
+    payload_id = "0b7c6a1e-5d0f-4a57-9f43-0c8f8b7a5d11"
+    city = "São Paulo"
+    started = time.perf_counter()
+    for _ in range(records):
+        log_call(payload_id, city)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-logging-")
+    results = []
+
+    def sync_case(label: str, formatter: logging.Formatter, lazy: bool):
+        handler = _file_handler(os.path.join(tmp, f"{len(results)}.log"), formatter)
+        logger = _logger(f"bench.{len(results)}", handler)
+        if lazy:
+            call = lambda pid, city: logger.info("🔎 Enriquecendo payload %s — cidade %s", pid, city)  # noqa: E731
+        else:
+            call = lambda pid, city: logger.info(f"🔎 Enriquecendo payload {pid} — cidade {city}")  # noqa: E731
+        caller = _run(args.records, call)
+        handler.flush()
+        results.append((label, caller, caller, 0))
+
+    def queue_case(label: str, sampling: float, queue_size: int):
+        log_queue = queue.Queue(maxsize=queue_size)
+        queue_handler = DroppingQueueHandler(log_queue)
+        listener = BoundedQueueListener(log_queue, _file_handler(os.path.join(tmp, f"{len(results)}.log"), JSONFormatter()))
+        listener.start()
+        logger = _logger(f"bench.{len(results)}", queue_handler, sampling)
+
+        started = time.perf_counter()
+        caller = _run(args.records, lambda pid, city: logger.info("🔎 Enriquecendo payload %s — cidade %s", pid, city))
+        listener.stop()
+        total = time.perf_counter() - started
+        results.append((label, caller, total, queue_handler.dropped))
+
+    sync_case("síncrono, formatter original, f-string", OriginalJSONFormatter(), lazy=False)
+    sync_case("síncrono, formatter atual, % lazy", JSONFormatter(), lazy=True)
+    queue_case("fila (sem limite prático)", 1.0, 0)
+    queue_case(f"fila limitada ({args.queue_size})", 1.0, args.queue_size)
+    queue_case(f"fila limitada + amostragem 0.1", 0.1, args.queue_size)
+
+    print(f"{args.records} records por variante\n")
+    print(f"{'variante':<42} {'caller µs/log':>14} {'total s':>9} {'descartados':>12}")
+    baseline = results[0][1]
+    for label, caller, total, dropped in results:
+        print(
+            f"{label:<42} {caller / args.records * 1e6:14.2f} {total:9.3f} {dropped:12d}"
+            f"   ({baseline / caller:4.1f}x no caller)"
+        )
+
+
+if __name__ == "__main__":
+    main()
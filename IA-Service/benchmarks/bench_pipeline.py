@@ -0,0 +1,352 @@
+"""Benchmark ponta a ponta do IA-Service: consume → enrich_payload → publish_enriched.
+
+Roda o consumer real (services.rabbit_consumer.consume) contra um stand-in de fila AMQP
+em memória (com prefetch) e um servidor fake da Groq (benchmarks/fake_llm_server.py),
+com WeatherPayloads sintéticos. Reporta throughput, latência p50/p95/p99 e taxa de fallback.
+
+Uso (a partir de IA-Service/):
+    python benchmarks/bench_pipeline.py --messages 2000 --latency-ms 300 --error-rate 0.02
+    LLM_BATCH_SIZE=8 CONSUMER_WORKERS=64 python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --no-llm          # só rule-based (custo do pipeline)
+    python benchmarks/bench_pipeline.py --envelope 50 --gzip   # 50 leituras por mensagem AMQP
+
+Variáveis de ambiente do serviço (CONSUMER_*, LLM_*, ENRICHMENT_CACHE_*...) valem normalmente.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+
+from fake_llm_server import MARKER  # noqa: E402
+
+
+class StandInMessage:
+    # Mesma interface usada pelo consumer: body/propriedades + process() (ack/reject ao sair)
+    def __init__(
+        self,
+        queue: "StandInQueue",
+        body: bytes,
+        enqueued_at: float,
+        external_ids: List[str],
+        content_type: Optional[str] = None,
+        content_encoding: Optional[str] = None,
+        headers: Optional[Dict] = None,
+    ):
+        self.queue = queue
+        self.body = body
+        self.enqueued_at = enqueued_at
+        self.delivered_at = 0.0
+        self.external_ids = external_ids
+        self.content_type = content_type
+        self.content_encoding = content_encoding
+        self.headers = headers or {}
+
+    @asynccontextmanager
+    async def process(self):
+        try:
+            yield self
+        except Exception:
+            self.queue.settle(self, acked=False)
+            raise
+        self.queue.settle(self, acked=True)
+
+
+class StandInQueue:
+    # Fila em memória com semântica de prefetch: no máximo `prefetch` mensagens sem ack.
+    # O iterador encerra após entregar `total` mensagens.
+    def __init__(self, prefetch: int, total: int):
+        self._messages: asyncio.Queue = asyncio.Queue()
+        self._unacked = asyncio.Semaphore(max(1, prefetch))
+        self.total = total
+        self.messages: List[StandInMessage] = []
+        self.delivered = 0
+        self.acked = 0
+        self.rejected = 0
+
+    def put(self, body: bytes, external_ids: List[str], **properties):
+        msg = StandInMessage(self, body, time.perf_counter(), external_ids, **properties)
+        self.messages.append(msg)
+        self._messages.put_nowait(msg)
+
+    def settle(self, msg: StandInMessage, acked: bool):
+        if acked:
+            self.acked += 1
+        else:
+            self.rejected += 1
+        self._unacked.release()
+
+    @asynccontextmanager
+    async def iterator(self):
+        yield self._iterate()
+
+    async def _iterate(self):
+        while self.delivered < self.total:
+            await self._unacked.acquire()
+            msg = await self._messages.get()
+            msg.delivered_at = time.perf_counter()
+            self.delivered += 1
+            yield msg
+
+
+class RecordingPublisher:
+    # Stand-in do RabbitPublisher: serializa como o real e registra o instante de publicação
+    def __init__(self):
+        self.published: Dict[str, float] = {}
+        self.fallbacks = 0
+
+    async def publish_enriched(self, enriched):
+        enriched.model_dump_json().encode()
+        self.published[enriched.base.external_id] = time.perf_counter()
+        if not any(MARKER in insight for insight in enriched.insights):
+            self.fallbacks += 1
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_fake_llm(args) -> subprocess.Popen:
+    port = _free_port()
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen([
+        sys.executable, os.path.join(HERE, "fake_llm_server.py"),
+        "--port", str(port),
+        "--latency-ms", str(args.latency_ms),
+        "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate),
+        "--rate-limit-rate", str(args.rate_limit_rate),
+    ])
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("servidor fake da Groq não subiu")
+
+
+def _synthetic_bodies(count: int, cities: int, seed: int) -> List[bytes]:
+    from schemas.weather_payload import WeatherPayload
+    from services.rule_engine import COLLECTOR_CONDITIONS
+
+    rng = random.Random(seed)
+    city_names = [f"Cidade {i:03d}" for i in range(max(1, cities))]
+    bodies = []
+    for _ in range(count):
+        payload = WeatherPayload(
+            external_id=str(uuid.UUID(int=rng.getrandbits(128))),
+            location={"lat": rng.uniform(-33, 5), "lon": rng.uniform(-73, -34), "city": rng.choice(city_names)},
+            temperature=round(rng.uniform(-5, 40), 1),
+            humidity=round(rng.uniform(10, 100), 1),
+            wind_speed=round(rng.uniform(0, 60), 1),
+            condition=rng.choice(COLLECTOR_CONDITIONS),
+            precipitation_mm=round(rng.uniform(0, 20), 1) if rng.random() < 0.3 else None,
+            timestamp=datetime.now(timezone.utc),
+        )
+        bodies.append(payload.model_dump_json().encode())
+    return bodies
+
+
+def _messages(bodies: List[bytes], envelope: int, compression: str) -> List[tuple]:
+    # [(corpo, external_ids, propriedades AMQP)]: uma leitura por mensagem ou envelopes de N
+    from core.envelope import ENVELOPE_CONTENT_TYPE, ENVELOPE_VERSION, ENVELOPE_VERSION_HEADER, encode_envelope
+
+    if envelope <= 1:
+        return [(body, [_external_id(body)], {"content_type": "application/json"}) for body in bodies]
+
+    messages = []
+    for start in range(0, len(bodies), envelope):
+        payloads = [json.loads(body) for body in bodies[start:start + envelope]]
+        body, content_encoding = encode_envelope(payloads, compression=compression)
+        properties = {
+            "content_type": ENVELOPE_CONTENT_TYPE,
+            "content_encoding": content_encoding,
+            "headers": {ENVELOPE_VERSION_HEADER: ENVELOPE_VERSION},
+        }
+        messages.append((body, [p["external_id"] for p in payloads], properties))
+    return messages
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _silence_service_logs():
+    # Mantém o custo de formatação dos logs, mas descarta a saída
+    devnull = open(os.devnull, "w")
+    for logger in logging.Logger.manager.loggerDict.values():
+        for handler in getattr(logger, "handlers", []):
+            if isinstance(handler, logging.StreamHandler):
+                handler.setStream(devnull)
+
+
+async def _run(args) -> Dict:
+    from core.config import config
+    from services.ia_service import service_stats
+    from services.llm_client import llm_client
+    from services.rabbit_consumer import consume
+
+    if not args.verbose:
+        _silence_service_logs()
+
+    bodies = _synthetic_bodies(args.messages, args.cities, args.seed)
+    messages = _messages(bodies, args.envelope, "gzip" if args.gzip else "none")
+    queue = StandInQueue(config.consumer_prefetch, len(messages))
+    publisher = RecordingPublisher()
+
+    async def produce():
+        for body, external_ids, properties in messages:
+            queue.put(body, external_ids, **properties)
+            await asyncio.sleep(len(external_ids) / args.rate)
+
+    # Com --rate 0 a fila começa cheia (backlog); senão as leituras chegam em taxa fixa
+    producer = None
+    if args.rate > 0:
+        producer = asyncio.create_task(produce())
+    else:
+        for body, external_ids, properties in messages:
+            queue.put(body, external_ids, **properties)
+
+    started = time.perf_counter()
+    await consume(queue, publisher)
+    elapsed = time.perf_counter() - started
+    if producer is not None:
+        await producer
+
+    stats = service_stats()
+    await llm_client.close()
+
+    service_ms, end_to_end_ms = [], []
+    for msg in queue.messages:
+        for external_id in msg.external_ids:
+            published_at = publisher.published.get(external_id)
+            if published_at is None:
+                continue
+            service_ms.append((published_at - msg.delivered_at) * 1000)
+            end_to_end_ms.append((published_at - msg.enqueued_at) * 1000)
+
+    return {
+        "config": {
+            "workers": config.consumer_workers,
+            "prefetch": config.consumer_prefetch,
+            "batch_size": config.llm_batch_size,
+            "cache_entries": config.enrichment_cache_max_entries,
+            "preserve_city_order": config.preserve_city_order,
+        },
+        "amqp_messages": len(messages),
+        "amqp_bytes": sum(len(body) for body, _, _ in messages),
+        "elapsed": elapsed,
+        "published": len(publisher.published),
+        "rejected": queue.rejected,
+        "fallbacks": publisher.fallbacks,
+        "service_ms": sorted(service_ms),
+        "end_to_end_ms": sorted(end_to_end_ms),
+        "stats": stats,
+    }
+
+
+def _external_id(body: bytes) -> Optional[str]:
+    try:
+        return json.loads(body)["external_id"]
+    except Exception:
+        return None
+
+
+def _report(args, result: Dict):
+    published = result["published"]
+    conf = result["config"]
+    print(
+        f"\n{args.messages} mensagens, {args.cities} cidades | workers={conf['workers']} "
+        f"prefetch={conf['prefetch']} lote={conf['batch_size']} cache={conf['cache_entries']} "
+        f"ordem_por_cidade={conf['preserve_city_order']}"
+    )
+    if args.no_llm:
+        print("LLM: desabilitado (somente rule-based)")
+    else:
+        print(
+            f"LLM fake: latência {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, "
+            f"erro {args.error_rate:.1%}, 429 {args.rate_limit_rate:.1%}"
+        )
+
+    print(f"\nthroughput      {published / result['elapsed']:10.1f} msg/s  ({result['elapsed']:.2f}s)")
+    print(f"publicadas      {published:10d}")
+    print(f"rejeitadas      {result['rejected']:10d}")
+    print(f"mensagens AMQP  {result['amqp_messages']:10d}  ({result['amqp_bytes'] / 1024:.1f} KiB)")
+    print(f"fallback        {result['fallbacks'] / published if published else 0:10.1%}")
+
+    for label, values in (("consumo→publish", result["service_ms"]), ("fila→publish", result["end_to_end_ms"])):
+        print(
+            f"{label:<16}p50 {_percentile(values, 50):8.1f} ms  p95 {_percentile(values, 95):8.1f} ms  "
+            f"p99 {_percentile(values, 99):8.1f} ms"
+        )
+
+    stats = result["stats"]
+    print(
+        f"\ngroq: {stats['llm']['requests']} requisições, {stats['llm']['rate_limited']} 429 | "
+        f"breaker: {stats['circuit_breaker']['state']} | cache hit rate: {stats['enrichment_cache']['hit_rate']:.1%}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--cities", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=0.0, help="leituras/s na chegada (0 = backlog cheio)")
+    parser.add_argument("--envelope", type=int, default=0, help="leituras por mensagem AMQP (envelope; 0 = avulsas)")
+    parser.add_argument("--gzip", action="store_true", help="comprime os envelopes")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--llm-url", default="", help="usa um servidor já em execução em vez de subir o fake")
+    parser.add_argument("--no-llm", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="mantém os logs do serviço no stdout")
+    args = parser.parse_args()
+
+    # A config do serviço é lida do ambiente na importação: ajusta antes de importar src/
+    fake = None
+    if args.no_llm:
+        os.environ["GROQ_API_KEY"] = ""
+    else:
+        os.environ.setdefault("GROQ_API_KEY", "bench-fake-key")
+        os.environ.setdefault("GROQ_REQUESTS_PER_MINUTE", "1000000")
+        os.environ.setdefault("GROQ_TOKENS_PER_MINUTE", "1000000000")
+        if args.llm_url:
+            os.environ["GROQ_BASE_URL"] = args.llm_url
+        else:
+            fake = _start_fake_llm(args)
+
+    try:
+        result = asyncio.run(_run(args))
+    finally:
+        if fake is not None:
+            fake.terminate()
+            fake.wait()
+
+    _report(args, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Micro-benchmark: recomendação rule-based pré-compilada vs. varredura original.
+
+Uso (a partir de IA-Service/):
+    python benchmarks/bench_rule_engine.py [--iterations 20000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from services.ia_service import _rule_based_recommendation  # noqa: E402
+from services.rule_engine import COLLECTOR_CONDITIONS, recommend, scan_recommendation  # noqa: E402
+
+
+def _check_shared_codes():
+    # core/weather_codes.py é copiado nos dois serviços: falha se a cópia do Collector divergir
+    here = os.path.dirname(__file__)
+    ia_copy = os.path.join(here, "..", "src", "core", "weather_codes.py")
+    collector_copy = os.path.join(here, "..", "..", "Collector", "src", "core", "weather_codes.py")
+    if not os.path.exists(collector_copy):
+        return
+    with open(ia_copy, "rb") as a, open(collector_copy, "rb") as b:
+        if a.read() != b.read():
+            sys.exit("core/weather_codes.py difere entre IA-Service e Collector")
+
+
+def _check_equivalence():
+    # O resultado compilado precisa ser idêntico ao da implementação original
+    for condition in COLLECTOR_CONDITIONS + ("Chuva Forte", "tempo estranho", ""):
+        expected = scan_recommendation(condition)
+        compiled = _rule_based_recommendation(condition)
+        assert list(expected[0]) == compiled[0], condition
+        assert [s.model_dump() for s in expected[1]] == [s.model_dump() for s in compiled[1]], condition
+        assert list(expected[2]) == compiled[2], condition
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    _check_shared_codes()
+    _check_equivalence()
+    conditions = COLLECTOR_CONDITIONS
+
+    def run(fn):
+        for condition in conditions:
+            fn(condition)
+
+    cases = [
+        ("varredura original (scan_recommendation)", scan_recommendation),
+        ("pré-compilado (_rule_based_recommendation)", _rule_based_recommendation),
+        ("pré-compilado, sem cópia (recommend)", recommend),
+    ]
+
+    calls = args.iterations * len(conditions)
+    print(f"{len(conditions)} rótulos x {args.iterations} iterações = {calls} chamadas\n")
+
+    baseline = None
+    for name, fn in cases:
+        elapsed = min(timeit.repeat(lambda: run(fn), number=args.iterations // 10 or 1, repeat=3)) * 10
+        per_call_us = elapsed / calls * 1e6
+        baseline = baseline or per_call_us
+        print(f"{name:<45} {per_call_us:8.3f} µs/chamada  ({baseline / per_call_us:6.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
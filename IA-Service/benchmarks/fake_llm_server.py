@@ -0,0 +1,105 @@
+"""Servidor fake compatível com a API de chat da Groq, para benchmarks sem chave/rede.
+
+Responde em /openai/v1/chat/completions com latência e taxa de erro configuráveis.
+Entende os dois formatos de prompt do IA-Service (item único e lote).
+
+Uso (a partir de IA-Service/):
+    python benchmarks/fake_llm_server.py --port 18080 --latency-ms 300 --error-rate 0.05
+    GROQ_BASE_URL=http://127.0.0.1:18080 GROQ_API_KEY=fake python src/main.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from aiohttp import web
+
+# Marcador nos insights: permite ao benchmark distinguir LLM de fallback rule-based
+MARKER = "fake-llm"
+BATCH_INPUT_HEADER = "Dados de entrada:\n"
+
+
+def _enrichment(item: dict) -> dict:
+    return {
+        "insights": [f"{MARKER}: {item.get('condition', '')} em {item.get('location', {}).get('city', '')}"],
+        "recommended_types": ["water"],
+        "suggested_pokemons": [{"name": "Squirtle", "reasoning": MARKER}],
+    }
+
+
+def _answer(prompt: str) -> dict:
+    data = prompt.split(BATCH_INPUT_HEADER, 1)[-1].split("\n\n", 1)[0]
+    parsed = json.loads(data)
+
+    if isinstance(parsed, list):
+        return {"results": [{"external_id": item["external_id"], **_enrichment(item)} for item in parsed]}
+    return _enrichment(parsed)
+
+
+def build_app(latency_ms: float, jitter_ms: float, error_rate: float, rate_limit_rate: float) -> web.Application:
+    counters = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    async def completions(request: web.Request):
+        counters["requests"] += 1
+        body = await request.json()
+
+        delay = max(0.0, random.gauss(latency_ms, jitter_ms)) / 1000.0
+        await asyncio.sleep(delay)
+
+        roll = random.random()
+        if roll < rate_limit_rate:
+            counters["rate_limited"] += 1
+            return web.json_response(
+                {"error": {"message": "rate limited", "type": "rate_limit_exceeded"}},
+                status=429,
+                headers={"retry-after": "1"},
+            )
+        if roll < rate_limit_rate + error_rate:
+            counters["errors"] += 1
+            return web.json_response({"error": {"message": "fake failure", "type": "server_error"}}, status=500)
+
+        prompt = body["messages"][-1]["content"]
+        content = json.dumps(_answer(prompt), ensure_ascii=False)
+        return web.json_response({
+            "id": f"chatcmpl-{counters['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": len(prompt) // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (len(prompt) + len(content)) // 4,
+            },
+        })
+
+    async def stats(request: web.Request):
+        return web.json_response(counters)
+
+    app = web.Application()
+    app.router.add_post("/openai/v1/chat/completions", completions)
+    app.router.add_get("/stats", stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de respostas 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fração de respostas 429")
+    args = parser.parse_args()
+
+    app = build_app(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate)
+    web.run_app(app, host=args.host, port=args.port, print=None, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,61 @@ class AppConfig:
     raw_queue: str = _get_env("RAW_QUEUE", "weather.raw")
     enriched_queue: str = _get_env("ENRICHED_QUEUE", "weather.enriched")
     groq_api_key: str = _get_env("GROQ_API_KEY", "")
+    groq_model: str = _get_env("GROQ_MODEL", "llama-3.1-8b-instant")
+    groq_base_url: str = _get_env("GROQ_BASE_URL", "")
+    groq_timeout_seconds: float = float(_get_env("GROQ_TIMEOUT_SECONDS", "30"))
+    groq_max_retries: int = int(_get_env("GROQ_MAX_RETRIES", "2"))
+    groq_requests_per_minute: float = float(_get_env("GROQ_REQUESTS_PER_MINUTE", "30"))
+    groq_tokens_per_minute: float = float(_get_env("GROQ_TOKENS_PER_MINUTE", "6000"))
+    groq_max_completion_tokens: int = int(_get_env("GROQ_MAX_COMPLETION_TOKENS", "400"))
+
+    # Circuit breaker e prazos no caminho do LLM. LLM_DEADLINE_SECONDS limita o enriquecimento de
+    # cada mensagem (incluindo a espera no rate limit local); estourá-lo não conta como falha da Groq.
+    # LLM_REQUEST_TIMEOUT_SECONDS limita cada requisição HTTP e, esse sim, conta para o circuito
+    llm_breaker_failure_threshold: int = int(_get_env("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+    llm_breaker_probe_interval_seconds: float = float(_get_env("LLM_BREAKER_PROBE_INTERVAL_SECONDS", "30"))
+    llm_deadline_seconds: float = float(_get_env("LLM_DEADLINE_SECONDS", "15"))
+    llm_request_timeout_seconds: float = float(_get_env("LLM_REQUEST_TIMEOUT_SECONDS", "10"))
+
+    # Micro-batching de prompts (1 = desabilitado)
+    llm_batch_size: int = int(_get_env("LLM_BATCH_SIZE", "1"))
+    llm_batch_max_wait_ms: float = float(_get_env("LLM_BATCH_MAX_WAIT_MS", "200"))
+
+    # Cache de enriquecimento (features climáticas quantizadas)
+    enrichment_cache_max_entries: int = int(_get_env("ENRICHMENT_CACHE_MAX_ENTRIES", "5000"))
+    enrichment_cache_ttl_seconds: int = int(_get_env("ENRICHMENT_CACHE_TTL_SECONDS", "21600"))
+    enrichment_bucket_temperature: float = float(_get_env("ENRICHMENT_BUCKET_TEMPERATURE", "2"))
+    enrichment_bucket_humidity: float = float(_get_env("ENRICHMENT_BUCKET_HUMIDITY", "10"))
+    enrichment_bucket_wind_speed: float = float(_get_env("ENRICHMENT_BUCKET_WIND_SPEED", "5"))
+    enrichment_bucket_precipitation: float = float(_get_env("ENRICHMENT_BUCKET_PRECIPITATION", "1"))
+
+    # Deduplicação por external_id (redeliveries após reconexão/crash)
+    dedup_max_entries: int = int(_get_env("DEDUP_MAX_ENTRIES", "20000"))
+    dedup_ttl_seconds: int = int(_get_env("DEDUP_TTL_SECONDS", "86400"))
+    dedup_path: str = _get_env("DEDUP_PATH", "")
+    # "skip": só confirma a duplicata; "republish": republica o resultado enriquecido guardado
+    dedup_on_duplicate: str = _get_env("DEDUP_ON_DUPLICATE", "skip").lower()
+
+    # Consumo concorrente
+    consumer_prefetch: int = int(_get_env("CONSUMER_PREFETCH", "32"))
+    consumer_workers: int = int(_get_env("CONSUMER_WORKERS", "16"))
+    preserve_city_order: bool = _get_env("PRESERVE_CITY_ORDER", "true").lower() == "true"
+
+    # Modo supervisor: N processos worker, cada um com sua conexão AMQP (1 = processo único).
+    # A cota GROQ_*_PER_MINUTE é da conta inteira: cada worker fica com 1/N dela
+    worker_processes: int = int(_get_env("IA_WORKER_PROCESSES", "1"))
+    worker_heartbeat_seconds: float = float(_get_env("IA_WORKER_HEARTBEAT_SECONDS", "5"))
+    worker_restart_backoff_seconds: float = float(_get_env("IA_WORKER_RESTART_BACKOFF_SECONDS", "1"))
+    worker_shutdown_timeout_seconds: float = float(_get_env("IA_WORKER_SHUTDOWN_TIMEOUT_SECONDS", "30"))
+
+    # Traces por mensagem (etapas e latências) mantidos em memória; 0 desabilita
+    trace_store_max_entries: int = int(_get_env("TRACE_STORE_MAX_ENTRIES", "10000"))
+
+    # Logging: "sync" (direto no stdout) ou "queue" (formatação/escrita numa thread, fila limitada)
+    log_mode: str = _get_env("LOG_MODE", "sync").lower()
+    log_queue_size: int = int(_get_env("LOG_QUEUE_SIZE", "10000"))
+    # Amostragem de INFO por logger, ex: "ia.consumer=0.1,ia.publisher=0.1"
+    log_sampling: str = _get_env("LOG_SAMPLING", "")
 
 
 config = AppConfig()
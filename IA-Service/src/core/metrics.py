@@ -0,0 +1,181 @@
+import bisect
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Métricas em processo no formato de exposição do Prometheus (text/plain 0.0.4).
+# Sem dependências: contadores/histogramas são dicts indexados pela tupla de labels.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LAG_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames and self.type != "histogram":
+            # Série sem labels aparece zerada desde o início
+            self._values[()] = 0.0
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def snapshot(self) -> Dict:
+        return {
+            "type": self.type,
+            "help": self.help,
+            "labelnames": list(self.labelnames),
+            "values": [[list(key), value] for key, value in self._values.items()],
+        }
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            # [contagens por bucket (não cumulativas) + overflow, soma, total]
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def snapshot(self) -> Dict:
+        data = super().snapshot()
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        # Serializável: usado no heartbeat dos workers (modo supervisor)
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+    def render(self) -> str:
+        return render_snapshots([({}, self.snapshot())])
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list((extra or {}).items()) + list(zip(names, values))
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render_snapshots(snapshots: List[Tuple[Dict[str, str], Dict[str, Dict]]]) -> str:
+    # Junta snapshots de um ou mais processos; cada um recebe seus labels extras (ex: worker)
+    lines: List[str] = []
+    names: Dict[str, Dict] = {}
+    for _, snapshot in snapshots:
+        for name, data in snapshot.items():
+            names.setdefault(name, data)
+
+    for name, meta in names.items():
+        lines.append(f"# HELP {name} {meta['help']}")
+        lines.append(f"# TYPE {name} {meta['type']}")
+
+        for extra, snapshot in snapshots:
+            data = snapshot.get(name)
+            if data is None:
+                continue
+            labelnames = data["labelnames"]
+
+            for key, value in data["values"]:
+                if data["type"] != "histogram":
+                    lines.append(f"{name}{_labels(labelnames, key, extra)} {_format_value(value)}")
+                    continue
+
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(data["buckets"] + [float("inf")], counts):
+                    cumulative += bucket_count
+                    le = {**(extra or {}), "le": _format_value(bound)}
+                    lines.append(f"{name}_bucket{_labels(labelnames, key, le)} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labelnames, key, extra)} {_format_value(total)}")
+                lines.append(f"{name}_count{_labels(labelnames, key, extra)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+MESSAGES_CONSUMED = registry.counter(
+    "ia_messages_consumed_total", "Leituras RAW recebidas da fila (cada leitura de um envelope conta)"
+)
+ENVELOPES_CONSUMED = registry.counter("ia_envelopes_consumed_total", "Envelopes (várias leituras) recebidos da fila")
+MESSAGES_PUBLISHED = registry.counter("ia_messages_published_total", "Mensagens enriquecidas publicadas")
+MESSAGES_FAILED = registry.counter(
+    "ia_messages_failed_total", "Mensagens que falharam no processamento", ("stage",)
+)
+MESSAGES_DUPLICATE = registry.counter(
+    "ia_messages_duplicate_total", "Redeliveries reconhecidas pelo external_id", ("action",)
+)
+MESSAGES_IN_FLIGHT = registry.gauge("ia_messages_in_flight", "Mensagens em processamento")
+ENRICH_DURATION = registry.histogram(
+    "ia_enrich_duration_seconds", "Duração de enrich_payload por método", ("method",)
+)
+GROQ_CALL_DURATION = registry.histogram(
+    "ia_groq_call_duration_seconds", "Duração de call_groq por resultado", ("outcome",)
+)
+QUEUE_LAG = registry.histogram(
+    "ia_queue_lag_seconds", "Tempo entre o timestamp da leitura e o início do processamento", buckets=LAG_BUCKETS
+)
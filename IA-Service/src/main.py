@@ -1,28 +1,86 @@
 import asyncio
+import signal
 from services.rabbit_consumer import start_consumer
+from core.config import config
 from core.logger import get_logger
 
 logger = get_logger("ia.main")
 
 
 from aiohttp import web
+from core.metrics import CONTENT_TYPE, registry
+from core.tracing import trace_store
+from services.ia_service import service_stats
+from services.supervisor import WorkerSupervisor
 
 async def health_check(request):
-    return web.Response(text="OK")
+    supervisor = request.app.get("supervisor")
+    if supervisor is None:
+        return web.Response(text="OK")
 
-async def start_web_server():
+    # Modo supervisor: saudável enquanto houver ao menos um worker com heartbeat recente
+    health = supervisor.health()
+    if health["healthy"] == 0:
+        return web.Response(text=f"DOWN {health['healthy']}/{health['workers']}", status=503)
+    return web.Response(text=f"OK {health['healthy']}/{health['workers']}")
+
+async def stats(request):
+    supervisor = request.app.get("supervisor")
+    if supervisor is None:
+        return web.json_response(service_stats())
+    return web.json_response({"workers": supervisor.stats()})
+
+async def metrics(request):
+    supervisor = request.app.get("supervisor")
+    body = registry.render() if supervisor is None else supervisor.metrics()
+    return web.Response(body=body.encode(), headers={"Content-Type": CONTENT_TYPE})
+
+async def recent_traces(request):
+    # Últimas mensagens rastreadas (no modo supervisor, recebidas dos workers via heartbeat)
+    try:
+        limit = min(1000, max(1, int(request.query.get("limit", "50"))))
+    except ValueError:
+        return web.json_response({"error": "limit inválido"}, status=400)
+    return web.json_response(trace_store.recent(limit))
+
+async def get_trace(request):
+    trace = trace_store.get(request.match_info["trace_id"])
+    if trace is None:
+        return web.json_response({"error": "Trace não encontrado"}, status=404)
+    return web.json_response(trace)
+
+async def start_web_server(supervisor: WorkerSupervisor = None):
     app = web.Application()
+    app["supervisor"] = supervisor
     app.router.add_get('/', health_check)
     app.router.add_get('/health', health_check)
+    app.router.add_get('/stats', stats)
+    app.router.add_get('/metrics', metrics)
+    app.router.add_get('/traces', recent_traces)
+    app.router.add_get('/traces/{trace_id}', get_trace)
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, '0.0.0.0', 8000)
     await site.start()
     logger.info("🌍 Dummy Web Server iniciado na porta 8000")
 
+async def run_supervisor():
+    supervisor = WorkerSupervisor(config.worker_processes)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, supervisor.request_stop)
+
+    await start_web_server(supervisor)
+    await supervisor.run()
+
 async def main():
     logger.info("🚀 IA-Service iniciado — aguardando mensagens do RabbitMQ...")
-    
+
+    if config.worker_processes > 1:
+        await run_supervisor()
+        return
+
     # Inicia servidor web (fake) e consumer (real) simultaneamente
     await asyncio.gather(
         start_web_server(),
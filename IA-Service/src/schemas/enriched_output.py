@@ -1,9 +1,12 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List
 from schemas.weather_payload import WeatherPayload
 
 
 class PokemonSuggestion(BaseModel):
+    # Imutável: as sugestões rule-based são pré-compiladas e compartilhadas
+    model_config = ConfigDict(frozen=True)
+
     name: str = Field(..., description="Nome do Pokémon sugerido")
     reasoning: str = Field(..., description="Por que esse Pokémon se relaciona com o clima atual?")
 
@@ -0,0 +1,104 @@
+import time
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+from core.config import config
+from core.logger import get_logger
+
+logger = get_logger("ia.circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Chamada recusada: o circuito está aberto"""
+    pass
+
+
+class CircuitBreaker:
+    # closed → (N falhas seguidas) → open → (intervalo de sonda) → half_open → sucesso: closed / falha: open
+    def __init__(self, name: str, failure_threshold: int, probe_interval_seconds: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.probe_interval_seconds = probe_interval_seconds
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.transitions: Deque[Tuple[float, str, str]] = deque(maxlen=50)
+
+    def _transition(self, new_state: str):
+        if new_state == self.state:
+            return
+
+        self.transitions.append((time.time(), self.state, new_state))
+        logger.warning("🔌 Circuit breaker '%s': %s → %s", self.name, self.state, new_state)
+        self.state = new_state
+
+        if new_state == OPEN:
+            self.opened_at = time.monotonic()
+
+    def is_open(self) -> bool:
+        # Aberto e ainda sem direito a sonda: chamadas devem ir direto ao fallback
+        if self.state == OPEN:
+            return time.monotonic() - self.opened_at < self.probe_interval_seconds
+        return self.state == HALF_OPEN and self._probe_in_flight
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.probe_interval_seconds:
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            # Uma única chamada de sonda por vez
+            self._probe_in_flight = True
+            return True
+
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.successes += 1
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        self._transition(CLOSED)
+
+    def release_probe(self):
+        # Chamada cancelada antes de um resultado (ex: shutdown): não conta como sucesso nem falha
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._transition(OPEN)
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "transitions": [
+                {"at": at, "from": old, "to": new} for at, old, new in self.transitions
+            ],
+        }
+
+
+llm_breaker = CircuitBreaker(
+    name="groq",
+    failure_threshold=config.llm_breaker_failure_threshold,
+    probe_interval_seconds=config.llm_breaker_probe_interval_seconds,
+)
@@ -0,0 +1,181 @@
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from core.config import config
+from core.logger import get_logger
+
+logger = get_logger("ia.dedup_store")
+
+# Marcador de "já processado" quando o resultado enriquecido não é guardado (modo skip)
+PROCESSED = b""
+
+# Limpeza de expirados no SQLite a cada N gravações
+PRUNE_EVERY = 1000
+
+
+class DedupStore:
+    # Registro LRU/TTL de external_ids já publicados, com índice opcional em SQLite
+    # (sobrevive a restarts). Guarda o JSON enriquecido quando o modo é republicar.
+    # Gravações no SQLite rodam numa thread própria, em ordem, fora do event loop.
+    def __init__(self, max_entries: int, ttl_seconds: float, path: Optional[str] = None, keep_results: bool = False):
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.path = path or None
+        self.keep_results = keep_results
+
+        # external_id -> (expira_em, json enriquecido | PROCESSED)
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        # Conexão de escrita, usada só pela thread de gravação
+        self._writer: Optional[sqlite3.Connection] = None
+        self._io: Optional[ThreadPoolExecutor] = None
+        self._writes = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.enabled and self.path:
+            self._open_db()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def _open_db(self):
+        try:
+            self._db = self._connect()
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS processed ("
+                " external_id TEXT PRIMARY KEY, expires_at REAL NOT NULL, result BLOB)"
+            )
+            self._prune_db(self._db)
+            count = self._db.execute("SELECT COUNT(*) FROM processed").fetchone()[0]
+            self._writer = self._connect(check_same_thread=False)
+            self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dedup")
+            logger.info("💾 Índice de deduplicação em disco: %s external_id(s)", count)
+        except sqlite3.Error as e:
+            logger.error("❌ Índice de deduplicação em disco indisponível (%s): %s", self.path, e)
+            self.close()
+
+    def _connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=check_same_thread)
+        # WAL: vários workers (modo supervisor) podem compartilhar o mesmo arquivo.
+        # synchronous=NORMAL: sem fsync por commit (no WAL, uma queda de energia pode perder
+        # só as últimas gravações — no pior caso, uma redelivery é reprocessada)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    @staticmethod
+    def _prune_db(db: sqlite3.Connection):
+        db.execute("DELETE FROM processed WHERE expires_at <= ?", (time.time(),))
+
+    def _remember(self, external_id: str, expires_at: float, result: bytes):
+        self._entries[external_id] = (expires_at, result)
+        self._entries.move_to_end(external_id)
+
+        while len(self._entries) > self.max_entries:
+            # Sai só da memória; o SQLite (se houver) continua respondendo por ele
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _lookup_db(self, external_id: str) -> Optional[Tuple[float, bytes]]:
+        if not self._db:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT expires_at, result FROM processed WHERE external_id = ?", (external_id,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error("❌ Falha ao consultar deduplicação de '%s': %s", external_id, e)
+            return None
+        if row is None:
+            return None
+        return row[0], bytes(row[1]) if row[1] is not None else PROCESSED
+
+    def get(self, external_id: str) -> Optional[bytes]:
+        # JSON enriquecido (ou PROCESSED) se o external_id já foi publicado; None caso contrário
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(external_id)
+        from_disk = False
+        if entry is None:
+            entry = self._lookup_db(external_id)
+            from_disk = entry is not None
+
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                self._entries.pop(external_id, None)
+            self.misses += 1
+            return None
+
+        if from_disk:
+            self.disk_hits += 1
+            self._remember(external_id, *entry)
+        else:
+            self._entries.move_to_end(external_id)
+
+        self.hits += 1
+        return entry[1]
+
+    def put(self, external_id: str, result: Optional[bytes] = None):
+        if not self.enabled:
+            return
+
+        expires_at = time.time() + self.ttl_seconds
+        stored = result if self.keep_results and result is not None else PROCESSED
+        self._remember(external_id, expires_at, stored)
+
+        if self._io is not None:
+            self._io.submit(self._persist, external_id, expires_at, stored or None)
+
+    def _persist(self, external_id: str, expires_at: float, stored: Optional[bytes]):
+        # Roda na thread de gravação
+        try:
+            self._writer.execute(
+                "INSERT OR REPLACE INTO processed (external_id, expires_at, result) VALUES (?, ?, ?)",
+                (external_id, expires_at, stored),
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._prune_db(self._writer)
+        except sqlite3.Error as e:
+            logger.error("❌ Falha ao persistir deduplicação de '%s': %s", external_id, e)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "mode": "republish" if self.keep_results else "skip",
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persistent": self._db is not None,
+        }
+
+    def close(self):
+        # Espera as gravações pendentes antes de fechar as conexões
+        if self._io is not None:
+            self._io.shutdown(wait=True)
+            self._io = None
+        for db in (self._writer, self._db):
+            if db is not None:
+                db.close()
+        self._writer = self._db = None
+
+
+dedup_store = DedupStore(
+    max_entries=config.dedup_max_entries,
+    ttl_seconds=config.dedup_ttl_seconds,
+    path=config.dedup_path,
+    keep_results=config.dedup_on_duplicate == "republish",
+)
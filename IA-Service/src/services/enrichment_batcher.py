@@ -0,0 +1,96 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from core.logger import get_logger
+from schemas.weather_payload import WeatherPayload
+from services.enrichment_cache import EnrichmentResult
+
+logger = get_logger("ia.batcher")
+
+# Recebe um lote de payloads e devolve {external_id: resultado ou None}
+BatchHandler = Callable[[List[WeatherPayload]], Awaitable[Dict[str, Optional[EnrichmentResult]]]]
+
+
+class EnrichmentBatcher:
+    # Agrupa payloads em lotes de até `max_size` ou `max_wait_ms` antes de chamar o LLM
+    def __init__(self, handler: BatchHandler, max_size: int, max_wait_ms: float):
+        self.handler = handler
+        self.max_size = max(1, max_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._pending: List[Tuple[WeatherPayload, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.items = 0
+        self.abandoned = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 1
+
+    async def submit(self, payload: WeatherPayload) -> Optional[EnrichmentResult]:
+        # Resultado do LLM para o payload; None se o item não veio/parseou na resposta do lote.
+        # Erros do lote inteiro (ex: Groq fora) são propagados.
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((payload, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _run(self, batch: List[Tuple[WeatherPayload, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(batch)
+
+        # A chamada é compartilhada: só é cancelada quando todos do lote desistiram
+        call = asyncio.ensure_future(self.handler([payload for payload, _ in batch]))
+
+        def _abandoned(_):
+            if all(future.cancelled() for _, future in batch):
+                call.cancel()
+
+        for _, future in batch:
+            future.add_done_callback(_abandoned)
+
+        await asyncio.wait({call})
+        if call.cancelled():
+            self.abandoned += 1
+            return
+
+        try:
+            results = call.result()
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for payload, future in batch:
+            if not future.done():
+                future.set_result(results.get(payload.external_id))
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "batches": self.batches,
+            "items": self.items,
+            "abandoned": self.abandoned,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
@@ -0,0 +1,105 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from core.config import config
+from schemas.weather_payload import WeatherPayload
+from schemas.enriched_output import PokemonSuggestion
+
+# (insights, recommended_types, suggested_pokemons)
+EnrichmentResult = Tuple[List[str], List[str], List[PokemonSuggestion]]
+
+
+def _bucket(value: Optional[float], step: float):
+    if value is None:
+        return None
+    if step <= 0:
+        return value
+    return math.floor(value / step)
+
+
+class EnrichmentCache:
+    # Cache LRU/TTL de enriquecimentos do LLM, chaveado por features climáticas quantizadas
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        temperature_step: float,
+        humidity_step: float,
+        wind_step: float,
+        precipitation_step: float,
+    ):
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.steps = (temperature_step, humidity_step, wind_step, precipitation_step)
+
+        self._entries: "OrderedDict[tuple, Tuple[float, EnrichmentResult]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def key(self, payload: WeatherPayload) -> tuple:
+        temperature_step, humidity_step, wind_step, precipitation_step = self.steps
+        return (
+            (payload.condition or "").strip().lower(),
+            _bucket(payload.temperature, temperature_step),
+            _bucket(payload.humidity, humidity_step),
+            _bucket(payload.wind_speed, wind_step),
+            _bucket(payload.precipitation_mm, precipitation_step),
+        )
+
+    def get(self, payload: WeatherPayload) -> Optional[EnrichmentResult]:
+        if not self.enabled:
+            return None
+
+        key = self.key(payload)
+        entry = self._entries.get(key)
+
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, payload: WeatherPayload, result: EnrichmentResult):
+        if not self.enabled:
+            return
+
+        key = self.key(payload)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, result)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "buckets": dict(zip(("temperature", "humidity", "wind_speed", "precipitation_mm"), self.steps)),
+        }
+
+
+enrichment_cache = EnrichmentCache(
+    max_entries=config.enrichment_cache_max_entries,
+    ttl_seconds=config.enrichment_cache_ttl_seconds,
+    temperature_step=config.enrichment_bucket_temperature,
+    humidity_step=config.enrichment_bucket_humidity,
+    wind_step=config.enrichment_bucket_wind_speed,
+    precipitation_step=config.enrichment_bucket_precipitation,
+)
@@ -1,182 +1,206 @@
 import asyncio
 import json
-from typing import List
+import time
+from typing import Dict, List, Optional
 
 from core.config import config
-from core.logger import get_logger
+from core.logger import get_logger, logging_stats
+from core.metrics import ENRICH_DURATION, GROQ_CALL_DURATION
+from core.tracing import add_stage, annotate, elapsed_ms
 
 from schemas.weather_payload import WeatherPayload
 from schemas.enriched_output import EnrichedWeatherPayload, PokemonSuggestion
+from services.circuit_breaker import CircuitOpenError, llm_breaker
+from services.dedup_store import dedup_store
+from services.enrichment_batcher import EnrichmentBatcher
+from services.enrichment_cache import EnrichmentResult, enrichment_cache
+from services.llm_client import llm_client
+from services.rule_engine import recommend
 
 logger = get_logger("ia.ai_service")
 
-CONDITION_TO_TYPES = {
-    "clear": ["fire", "grass"],
-    "céu limpo": ["fire", "grass"],
-    "sunny": ["fire", "grass"],
-    "partly cloudy": ["normal"],
-    "parcialmente nublado": ["normal"],
-    "cloudy": ["rock", "normal"],
-    "nublado": ["rock", "normal"],
-    "rain": ["water", "electric"],
-    "chuva": ["water", "electric"],
-    "drizzle": ["water"],
-    "snow": ["ice"],
-    "neve": ["ice"],
-    "fog": ["ghost", "dark"],
-    "neblina": ["ghost", "dark"],
-    "thunderstorm": ["electric", "dragon"],
-    "trovoada": ["electric", "dragon"],
-}
-
-TYPE_TO_EXAMPLE_POKEMONS = {
-    "water": ["Squirtle", "Poliwag", "Vaporeon"],
-    "electric": ["Pikachu", "Jolteon", "Magnemite"],
-    "fire": ["Charmander", "Vulpix", "Growlithe"],
-    "grass": ["Bulbasaur", "Oddish", "Leafeon"],
-    "ice": ["Snom", "Lapras", "Glalie"],
-    "rock": ["Geodude", "Onix", "Rhyhorn"],
-    "ghost": ["Gastly", "Misdreavus", "Gengar"],
-    "dark": ["Murkrow", "Sableye", "Houndour"],
-    "normal": ["Rattata", "Pidgey", "Bidoof"],
-    "dragon": ["Dratini", "Bagon", "Gible"],
-}
-
-
-async def call_groq(prompt: str) -> str:
-    try:
-        from groq import Groq
-    except Exception as e:
-        raise RuntimeError(f"Groq client não disponível: {e}")
-
+async def call_groq(prompt: str, completion_tokens: Optional[int] = None) -> str:
     if not config.groq_api_key:
         raise RuntimeError("GROQ_API_KEY não configurada")
 
-    try:
-        client = Groq(api_key=config.groq_api_key)
-
-        def _call():
-            return client.chat.completions.create(
-                model="llama-3.1-8b-instant",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "Você é um assistente que SEMPRE responde em JSON válido, "
-                            "sem texto fora do JSON."
-                        ),
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.2,
-                response_format={"type": "json_object"},
-            )
+    if not llm_breaker.allow():
+        raise CircuitOpenError("Circuito da Groq aberto")
 
-        resp = await asyncio.to_thread(_call)
-        if getattr(resp, "choices", None):
-            content = getattr(resp.choices[0].message, "content", None)
-            if isinstance(content, str):
-                return content
-        return json.dumps({"raw_response": str(resp)}, ensure_ascii=False)
+    started = time.perf_counter()
+    try:
+        result = await llm_client.complete(prompt, completion_tokens, deadline=config.llm_request_timeout_seconds)
+    except asyncio.TimeoutError:
+        # Prazo da requisição HTTP estourado (contado só após o rate limit local): falha do LLM
+        GROQ_CALL_DURATION.observe(time.perf_counter() - started, outcome="timeout")
+        llm_breaker.record_failure()
+        raise
+    except asyncio.CancelledError:
+        # Cancelamento externo (prazo da mensagem, shutdown, lote abandonado): não diz nada
+        # sobre a saúde da Groq — inclui o prazo estourado na fila do rate limit local
+        llm_breaker.release_probe()
+        raise
     except Exception as e:
+        GROQ_CALL_DURATION.observe(time.perf_counter() - started, outcome="error")
+        llm_breaker.record_failure()
         raise RuntimeError(f"Erro ao chamar Groq: {e}")
 
-
-def _normalize_condition(cond: str) -> str:
-    if not cond:
-        return ""
-    return cond.strip().lower()
+    GROQ_CALL_DURATION.observe(time.perf_counter() - started, outcome="ok")
+    llm_breaker.record_success()
+    return result
 
 
 def _rule_based_recommendation(condition: str) -> (List[str], List[PokemonSuggestion], List[str]):
-    cond_norm = _normalize_condition(condition)
-    types = CONDITION_TO_TYPES.get(cond_norm)
-    if not types:
-        for key, t in CONDITION_TO_TYPES.items():
-            if key in cond_norm:
-                types = t
-                break
-
-    if not types:
-        types = ["normal"]
-
-    types = list(dict.fromkeys(types))
-
-    suggestions: List[PokemonSuggestion] = []
-    for t in types:
-        examples = TYPE_TO_EXAMPLE_POKEMONS.get(t, [])
-        for ex in examples:
-            reasoning = f"Tipo {t} — apropriado para clima '{condition}'"
-            suggestions.append(PokemonSuggestion(name=ex, reasoning=reasoning))
-            if len(suggestions) >= 6:
-                break
-        if len(suggestions) >= 6:
-            break
-
-    insights = [
-        f"Condição registrada: '{condition}'. Tipos recomendados: {', '.join(types)}.",
-        f"Exemplos de pokémons que se adaptam ao clima: {', '.join([p.name for p in suggestions[:5]])}."
-    ]
-
-    return types, suggestions, insights
+    # Resultado pré-compilado (rule_engine) — sem normalização nem varredura por chamada
+    result = recommend(condition)
+    return list(result.types), list(result.suggestions), list(result.insights)
+
+
+def _parse_enrichment(parsed: dict) -> EnrichmentResult:
+    # Normaliza a resposta JSON do modelo em (insights, recommended_types, suggested_pokemons)
+    raw_insights = parsed.get("insights") or []
+    insights: List[str] = []
+    if isinstance(raw_insights, list):
+        for it in raw_insights:
+            if isinstance(it, str):
+                insights.append(it)
+            elif isinstance(it, dict):
+                text = (
+                    it.get("text")
+                    or it.get("description")
+                    or it.get("summary")
+                )
+                insights.append(
+                    text if isinstance(text, str) else json.dumps(it, ensure_ascii=False)
+                )
+            else:
+                insights.append(str(it))
+    else:
+        insights = [str(raw_insights)]
+
+    recommended_types = parsed.get("recommended_types") or []
+    suggested_raw = parsed.get("suggested_pokemons") or []
+
+    suggested: List[PokemonSuggestion] = []
+    for item in suggested_raw:
+        if isinstance(item, dict) and item.get("name"):
+            suggested.append(
+                PokemonSuggestion(
+                    name=item["name"], reasoning=item.get("reasoning", "")
+                )
+            )
+        elif isinstance(item, str):
+            suggested.append(
+                PokemonSuggestion(
+                    name=item, reasoning="sugerido pelo modelo"
+                )
+            )
+
+    return insights, recommended_types, suggested
+
+
+async def _enrich_batch_via_llm(payloads: List[WeatherPayload]) -> Dict[str, Optional[EnrichmentResult]]:
+    # Um único prompt para o lote; a resposta é um array chaveado por external_id
+    items = [payload.model_dump() for payload in payloads]
+    prompt = (
+        "Você é um assistente que analisa dados climáticos e sugere tipos de pokémon "
+        "e exemplos de pokémons que combinam com o clima. Para CADA item da lista de entrada, "
+        "gere uma análise independente. Retorne um objeto JSON no formato:\n"
+        '{"results": [{"external_id": "...", "insights": [..], "recommended_types": [..], '
+        '"suggested_pokemons": [{"name": "...", "reasoning": "..."}]}, ...]}\n'
+        "Use exatamente o external_id de cada item de entrada.\n\n"
+        "Dados de entrada:\n"
+        f"{json.dumps(items, default=str, ensure_ascii=False)}"
+    )
+
+    model_resp = await call_groq(prompt, config.groq_max_completion_tokens * len(payloads))
+    parsed = json.loads(model_resp)
+
+    entries = parsed.get("results") if isinstance(parsed, dict) else parsed
+    if not isinstance(entries, list):
+        raise ValueError("resposta em lote sem o array 'results'")
+
+    results: Dict[str, Optional[EnrichmentResult]] = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get("external_id"):
+            continue
+        try:
+            results[str(entry["external_id"])] = _parse_enrichment(entry)
+        except Exception as e:
+            logger.error("⚠ Item do lote inválido (%s): %s", entry.get("external_id"), e)
+
+    return results
+
+
+enrichment_batcher = EnrichmentBatcher(
+    handler=_enrich_batch_via_llm,
+    max_size=config.llm_batch_size,
+    max_wait_ms=config.llm_batch_max_wait_ms,
+)
+
+
+async def _enrich_via_llm(payload: WeatherPayload) -> Optional[EnrichmentResult]:
+    # Resultado do LLM para um payload (em lote quando LLM_BATCH_SIZE > 1); None = usar fallback
+    if enrichment_batcher.enabled:
+        started = time.perf_counter()
+        try:
+            # Inclui a espera pelo fechamento do lote
+            return await enrichment_batcher.submit(payload)
+        finally:
+            add_stage("llm_ms", elapsed_ms(started))
+
+    prompt = (
+        "Você é um assistente que analisa dados climáticos e sugere tipos de pokémon "
+        "e exemplos de pokémons que combinam com o clima. Retorne uma resposta JSON com os campos:\n"
+        "insights: [..], recommended_types: [..], suggested_pokemons: [{name:, reasoning:}, ...]\n\n"
+        "Dados de entrada:\n"
+        f"{json.dumps(payload.model_dump(), default=str, ensure_ascii=False)}\n\n"
+        "Se não for possível gerar, retorne apenas um texto descrevendo o motivo."
+    )
+
+    started = time.perf_counter()
+    try:
+        model_resp = await call_groq(prompt)
+    finally:
+        add_stage("llm_ms", elapsed_ms(started))
+    return _parse_enrichment(json.loads(model_resp))
+
+
+def _observe_enrich(started: float, method: str):
+    ENRICH_DURATION.observe(time.perf_counter() - started, method=method)
+    annotate(enrich_method=method)
 
 
 async def enrich_payload(payload: WeatherPayload) -> EnrichedWeatherPayload:
-    logger.info(f"🔎 Enriquecendo payload {payload.external_id} — cidade {payload.location.city}")
+    logger.info("🔎 Enriquecendo payload %s — cidade %s", payload.external_id, payload.location.city)
 
     condition = payload.condition or ""
+    started = time.perf_counter()
     try:
         if config.groq_api_key:
-            prompt = (
-                "Você é um assistente que analisa dados climáticos e sugere tipos de pokémon "
-                "e exemplos de pokémons que combinam com o clima. Retorne uma resposta JSON com os campos:\n"
-                "insights: [..], recommended_types: [..], suggested_pokemons: [{name:, reasoning:}, ...]\n\n"
-                "Dados de entrada:\n"
-                f"{json.dumps(payload.model_dump(), default=str, ensure_ascii=False)}\n\n"
-                "Se não for possível gerar, retorne apenas um texto descrevendo o motivo."
-            )
+            # Cache antes do circuito: com a Groq fora, resultados já conhecidos continuam valendo
+            cached = enrichment_cache.get(payload)
+            if cached is not None:
+                insights, recommended_types, suggested = cached
+                logger.info("♻ Enriquecimento servido do cache")
+                _observe_enrich(started, "cache")
+                return EnrichedWeatherPayload(
+                    base=payload,
+                    insights=list(insights),
+                    recommended_types=list(recommended_types),
+                    suggested_pokemons=list(suggested),
+                )
+
+        if config.groq_api_key and llm_breaker.is_open():
+            logger.info("🔌 Circuito da Groq aberto — usando rule-based direto")
 
+        elif config.groq_api_key:
             try:
-                model_resp = await call_groq(prompt)
-                parsed = json.loads(model_resp)
-
-                raw_insights = parsed.get("insights") or []
-                insights: List[str] = []
-                if isinstance(raw_insights, list):
-                    for it in raw_insights:
-                        if isinstance(it, str):
-                            insights.append(it)
-                        elif isinstance(it, dict):
-                            text = (
-                                it.get("text")
-                                or it.get("description")
-                                or it.get("summary")
-                            )
-                            insights.append(
-                                text if isinstance(text, str) else json.dumps(it, ensure_ascii=False)
-                            )
-                        else:
-                            insights.append(str(it))
-                else:
-                    insights = [str(raw_insights)]
-
-                recommended_types = parsed.get("recommended_types") or []
-                suggested_raw = parsed.get("suggested_pokemons") or []
-
-                suggested: List[PokemonSuggestion] = []
-                for item in suggested_raw:
-                    if isinstance(item, dict) and item.get("name"):
-                        suggested.append(
-                            PokemonSuggestion(
-                                name=item["name"], reasoning=item.get("reasoning", "")
-                            )
-                        )
-                    elif isinstance(item, str):
-                        suggested.append(
-                            PokemonSuggestion(
-                                name=item, reasoning="sugerido pelo modelo"
-                            )
-                        )
+                # Prazo por mensagem (LLM_DEADLINE_SECONDS), incluindo rate limit local e Retry-After;
+                # estourado, vale o rule-based
+                result = await asyncio.wait_for(_enrich_via_llm(payload), timeout=config.llm_deadline_seconds)
+                if result is None:
+                    raise ValueError("item ausente ou inválido na resposta em lote")
+                insights, recommended_types, suggested = result
 
                 enriched = EnrichedWeatherPayload(
                     base=payload,
@@ -184,11 +208,17 @@ async def enrich_payload(payload: WeatherPayload) -> EnrichedWeatherPayload:
                     recommended_types=recommended_types,
                     suggested_pokemons=suggested,
                 )
+                enrichment_cache.put(payload, (insights, recommended_types, suggested))
                 logger.info("✅ Enriquecimento via Groq bem-sucedido")
+                _observe_enrich(started, "groq")
                 return enriched
 
+            except asyncio.TimeoutError:
+                logger.error("⏱ Prazo estourado na Groq — usando fallback rule-based")
+            except CircuitOpenError:
+                logger.info("🔌 Circuito da Groq aberto — usando fallback rule-based")
             except Exception as e:
-                logger.error(f"⚠ Falha ao chamar Groq: {e} — usando fallback rule-based")
+                logger.error("⚠ Falha ao chamar Groq: %s — usando fallback rule-based", e)
 
         types, suggestions, insights = _rule_based_recommendation(condition)
         enriched = EnrichedWeatherPayload(
@@ -198,10 +228,11 @@ async def enrich_payload(payload: WeatherPayload) -> EnrichedWeatherPayload:
             suggested_pokemons=suggestions,
         )
         logger.info("🔧 Enriquecimento rule-based aplicado")
+        _observe_enrich(started, "rule_based")
         return enriched
 
     except Exception as final_exc:
-        logger.error(f"Erro inesperado durante enrich: {final_exc}")
+        logger.error("Erro inesperado durante enrich: %s", final_exc)
         types, suggestions, insights = _rule_based_recommendation(condition)
         enriched = EnrichedWeatherPayload(
             base=payload,
@@ -209,4 +240,17 @@ async def enrich_payload(payload: WeatherPayload) -> EnrichedWeatherPayload:
             recommended_types=types,
             suggested_pokemons=suggestions,
         )
+        _observe_enrich(started, "rule_based")
         return enriched
+
+
+def service_stats() -> Dict:
+    # Estatísticas locais do processo (servidor HTTP ou heartbeat dos workers)
+    return {
+        "llm": llm_client.stats(),
+        "circuit_breaker": llm_breaker.stats(),
+        "enrichment_cache": enrichment_cache.stats(),
+        "batcher": enrichment_batcher.stats(),
+        "dedup": dedup_store.stats(),
+        "logging": logging_stats(),
+    }
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import time
+from typing import Dict, Optional
+
+from core.config import config
+from core.logger import get_logger
+
+logger = get_logger("ia.llm_client")
+
+SYSTEM_PROMPT = (
+    "Você é um assistente que SEMPRE responde em JSON válido, "
+    "sem texto fora do JSON."
+)
+
+
+class TokenBucket:
+    # Token bucket por minuto (requisições ou tokens), com pausa forçada após um 429
+    def __init__(self, per_minute: float):
+        self.capacity = max(1.0, per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1.0):
+        amount = min(amount, self.capacity)
+
+        # Lock garante atendimento em ordem de chegada
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+
+                wait = max(0.0, self.blocked_until - now)
+                if not wait and self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+
+                await asyncio.sleep(max(wait, (amount - self.tokens) / self.rate))
+
+    def adjust(self, amount: float):
+        # Acerto após o uso real: positivo devolve tokens, negativo cobra o excedente
+        # (saldo negativo atrasa as próximas requisições)
+        self._refill(time.monotonic())
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def block_for(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class GroqLLMClient:
+    # Cliente assíncrono de longa duração para a Groq (conexões reaproveitadas),
+    # limitado por requisições e tokens por minuto
+    def __init__(self):
+        self._client = None
+        # Modo supervisor: cada processo worker tem o seu cliente, então a cota da conta
+        # é dividida igualmente entre os IA_WORKER_PROCESSES processos
+        self.quota_share = max(1, config.worker_processes)
+        self.requests_bucket = TokenBucket(config.groq_requests_per_minute / self.quota_share)
+        self.tokens_bucket = TokenBucket(config.groq_tokens_per_minute / self.quota_share)
+
+        self.requests = 0
+        self.rate_limited = 0
+        self.tokens_used = 0
+
+    def _ensure_client(self):
+        if self._client is not None:
+            return self._client
+
+        try:
+            from groq import AsyncGroq
+        except Exception as e:
+            raise RuntimeError(f"Groq client não disponível: {e}")
+
+        # Retries ficam por nossa conta (respeitando Retry-After e o rate limit local)
+        self._client = AsyncGroq(
+            api_key=config.groq_api_key,
+            base_url=config.groq_base_url or None,
+            timeout=config.groq_timeout_seconds,
+            max_retries=0,
+        )
+        logger.info("🔌 Cliente Groq iniciado (modelo %s)", config.groq_model)
+        return self._client
+
+    @staticmethod
+    def _estimate_tokens(prompt: str, completion_tokens: int) -> int:
+        # Estimativa barata (~4 caracteres por token) + orçamento da resposta
+        return (len(SYSTEM_PROMPT) + len(prompt)) // 4 + completion_tokens
+
+    @staticmethod
+    def _retry_after(error) -> float:
+        response = getattr(error, "response", None)
+        value = response.headers.get("retry-after") if response is not None else None
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            return 1.0
+
+    async def complete(
+        self, prompt: str, completion_tokens: Optional[int] = None, deadline: Optional[float] = None
+    ) -> str:
+        # `deadline` limita cada requisição HTTP e só começa a contar depois de obtidos os tokens
+        # do rate limit local (asyncio.TimeoutError quando estoura). A espera nos buckets e no
+        # Retry-After é limitada pelo prazo por mensagem de quem chama (cancelamento)
+        from groq import RateLimitError
+
+        client = self._ensure_client()
+        # O limite da resposta vai na requisição: a estimativa reservada no bucket é um teto real
+        max_tokens = completion_tokens or config.groq_max_completion_tokens
+        estimated = self._estimate_tokens(prompt, max_tokens)
+
+        for attempt in range(config.groq_max_retries + 1):
+            await self.requests_bucket.acquire(1)
+            await self.tokens_bucket.acquire(estimated)
+
+            try:
+                self.requests += 1
+                resp = await asyncio.wait_for(
+                    client.chat.completions.create(
+                        model=config.groq_model,
+                        messages=[
+                            {"role": "system", "content": SYSTEM_PROMPT},
+                            {"role": "user", "content": prompt},
+                        ],
+                        temperature=0.2,
+                        max_tokens=max_tokens,
+                        response_format={"type": "json_object"},
+                    ),
+                    timeout=deadline,
+                )
+            except RateLimitError as e:
+                self.rate_limited += 1
+                delay = self._retry_after(e)
+                self.requests_bucket.block_for(delay)
+                self.tokens_bucket.block_for(delay)
+
+                if attempt >= config.groq_max_retries:
+                    raise
+                logger.warning("⏳ Groq respondeu 429 — aguardando %.1fs (Retry-After)", delay)
+                continue
+
+            usage = getattr(resp, "usage", None)
+            total_tokens = getattr(usage, "total_tokens", 0) or 0
+            self.tokens_used += total_tokens
+            if total_tokens:
+                # Reconcilia o bucket com o consumo informado pela Groq
+                self.tokens_bucket.adjust(min(estimated, self.tokens_bucket.capacity) - total_tokens)
+
+            if getattr(resp, "choices", None):
+                content = getattr(resp.choices[0].message, "content", None)
+                if isinstance(content, str):
+                    return content
+            return json.dumps({"raw_response": str(resp)}, ensure_ascii=False)
+
+        raise RuntimeError("Groq indisponível após novas tentativas")
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "tokens_used": self.tokens_used,
+            "requests_per_minute": round(self.requests_bucket.capacity, 2),
+            "tokens_per_minute": round(self.tokens_bucket.capacity, 2),
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+llm_client = GroqLLMClient()
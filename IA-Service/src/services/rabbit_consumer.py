@@ -1,39 +1,269 @@
+import asyncio
+import time
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+
 import aio_pika
+from aio_pika.abc import AbstractIncomingMessage
 from core.config import config
+from core.envelope import ENVELOPE_VERSION_HEADER, EnvelopeError, decode_envelope, is_envelope
 from core.logger import get_logger
+from core.metrics import (
+    ENVELOPES_CONSUMED,
+    MESSAGES_CONSUMED,
+    MESSAGES_DUPLICATE,
+    MESSAGES_FAILED,
+    MESSAGES_IN_FLIGHT,
+    MESSAGES_PUBLISHED,
+    QUEUE_LAG,
+)
+from core.tracing import (
+    TRACE_ID_HEADER,
+    TRACE_PUBLISHED_AT_HEADER,
+    TRACE_STAGES_HEADER,
+    TRACE_STARTED_AT_HEADER,
+    add_stage,
+    annotate,
+    elapsed_ms,
+    new_trace,
+    set_current,
+    trace_store,
+)
 
 from schemas.weather_payload import WeatherPayload
 from schemas.enriched_output import EnrichedWeatherPayload
+from services.dedup_store import PROCESSED, dedup_store
 from services.ia_service import enrich_payload
+from services.llm_client import llm_client
 from services.rabbit_publisher import RabbitPublisher
 
 logger = get_logger("ia.consumer")
 
+# external_id -> future resolvido quando a leitura em processamento termina (publicada ou não).
+# Cobre redeliveries concorrentes neste processo; entre workers do supervisor vale só o dedup_store
+_in_flight: Dict[str, asyncio.Future] = {}
+
+
+def _header(headers: Dict, name: str):
+    value = headers.get(name)
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _readings(msg: AbstractIncomingMessage) -> List[Tuple[Optional[WeatherPayload], Optional[Exception], Dict]]:
+    # [(leitura, erro de parse, headers de trace)]: uma por mensagem avulsa, N por envelope
+    headers = getattr(msg, "headers", None) or {}
+
+    if not is_envelope(getattr(msg, "content_type", None)):
+        try:
+            return [(WeatherPayload.model_validate_json(msg.body), None, headers)]
+        except Exception as e:
+            return [(None, e, headers)]
+
+    try:
+        items = decode_envelope(
+            msg.body, getattr(msg, "content_encoding", None), _header(headers, ENVELOPE_VERSION_HEADER)
+        )
+    except EnvelopeError as e:
+        return [(None, e, {})]
+
+    readings = []
+    for payload, trace_headers in items:
+        try:
+            readings.append((WeatherPayload.model_validate(payload), None, trace_headers or {}))
+        except Exception as e:
+            readings.append((None, e, trace_headers or {}))
+    return readings
+
+
+def _start_trace(headers: Dict, raw: Optional[WeatherPayload]) -> Dict:
+    # Continua o trace do Collector (headers x-trace-*); sem headers, usa o external_id
+    trace_id = _header(headers, TRACE_ID_HEADER) or (raw.external_id if raw else None) or uuid.uuid4().hex
+
+    trace = new_trace(
+        trace_id,
+        "ia-service",
+        city=raw.location.city if raw else None,
+        upstream=dict(headers.get(TRACE_STAGES_HEADER) or {}),
+    )
+    if headers.get(TRACE_STARTED_AT_HEADER):
+        trace["origin_started_at"] = float(headers[TRACE_STARTED_AT_HEADER])
+
+    published_at = headers.get(TRACE_PUBLISHED_AT_HEADER)
+    if published_at:
+        # Tempo na fila RAW (relógios de hosts diferentes: valor aproximado)
+        add_stage("queue_ms", round(max(0.0, trace["started_at"] - float(published_at)) * 1000, 3), trace)
+    return trace
+
+
+async def _process_message(
+    msg: AbstractIncomingMessage,
+    publisher: RabbitPublisher,
+    raw: Optional[WeatherPayload],
+    parse_error: Optional[Exception],
+    previous: Optional[asyncio.Future],
+):
+    # Ack/nack acontece na saída de msg.process(), só depois do processamento desta mensagem
+    async with msg.process():
+        await _process_reading(publisher, raw, parse_error, previous)
+
+
+async def _process_reading(
+    publisher: RabbitPublisher,
+    raw: Optional[WeatherPayload],
+    parse_error: Optional[Exception],
+    previous: Optional[asyncio.Future],
+):
+    try:
+        if raw is None:
+            raise parse_error
+
+        # Lag: do timestamp da leitura (Collector) até o início do processamento
+        QUEUE_LAG.observe(max(0.0, time.time() - raw.timestamp.timestamp()))
+
+        if previous is not None:
+            # Preserva a ordem por cidade: espera a mensagem anterior da mesma cidade
+            started = time.perf_counter()
+            await asyncio.shield(previous)
+            add_stage("wait_ms", elapsed_ms(started))
+
+        # Mesma leitura já em processamento (redelivery concorrente): espera ela terminar
+        # e só então consulta a deduplicação
+        while raw.external_id in _in_flight:
+            started = time.perf_counter()
+            await asyncio.shield(_in_flight[raw.external_id])
+            add_stage("wait_ms", elapsed_ms(started))
+
+        # Redelivery de algo já publicado: não gasta LLM nem duplica registros
+        previous_result = dedup_store.get(raw.external_id)
+        if previous_result is not None:
+            annotate(duplicate=True)
+            if previous_result == PROCESSED:
+                MESSAGES_DUPLICATE.inc(action="skipped")
+                logger.info("♻ Duplicata %s ignorada (já publicada)", raw.external_id)
+                return
+
+            MESSAGES_DUPLICATE.inc(action="republished")
+            logger.info("♻ Duplicata %s → republicando resultado guardado", raw.external_id)
+            await publisher.publish_enriched(EnrichedWeatherPayload.model_validate_json(previous_result))
+            MESSAGES_PUBLISHED.inc()
+            return
+
+        marker = _in_flight[raw.external_id] = asyncio.get_running_loop().create_future()
+        try:
+            started = time.perf_counter()
+            enriched: EnrichedWeatherPayload = await enrich_payload(raw)
+            add_stage("enrich_ms", elapsed_ms(started))
+
+            logger.info("🤖 OK %s → enviando enriquecido", raw.external_id)
+            await publisher.publish_enriched(enriched)
+            MESSAGES_PUBLISHED.inc()
+            dedup_store.put(
+                raw.external_id,
+                enriched.model_dump_json().encode() if dedup_store.keep_results else None,
+            )
+        finally:
+            del _in_flight[raw.external_id]
+            marker.set_result(None)
+
+    except Exception as e:
+        MESSAGES_FAILED.inc(stage="parse" if raw is None else "process")
+        annotate(error=repr(e))
+        logger.error("❌ Falha ao processar → %s", e)
+
+
+async def _settle_envelope(msg: AbstractIncomingMessage, readings: List[asyncio.Task]):
+    # Envelope: o ack sai uma vez, quando todas as leituras dele terminarem
+    async with msg.process():
+        await asyncio.gather(*readings)
+
+
+async def consume(queue, publisher: RabbitPublisher):
+    # Núcleo do consumo: funciona com uma fila aio_pika ou qualquer objeto com a mesma interface
+    # (iterator() assíncrono de mensagens com body/process()), como o stand-in dos benchmarks
+    workers = asyncio.Semaphore(max(1, config.consumer_workers))
+    in_flight: Set[asyncio.Task] = set()
+    # cidade -> future da última mensagem em processamento daquela cidade
+    city_tails: Dict[str, asyncio.Future] = {}
+
+    async def _run(msg: Optional[AbstractIncomingMessage], raw, parse_error, city: Optional[str], previous, done, trace):
+        # Trace da mensagem visível para enrich/publish via contextvar (contexto próprio desta task).
+        # msg=None: leitura de um envelope (o ack fica com _settle_envelope)
+        set_current(trace)
+        try:
+            if msg is None:
+                await _process_reading(publisher, raw, parse_error, previous)
+            else:
+                await _process_message(msg, publisher, raw, parse_error, previous)
+        finally:
+            trace_store.record(trace)
+            workers.release()
+            MESSAGES_IN_FLIGHT.dec()
+            done.set_result(None)
+            if city is not None and city_tails.get(city) is done:
+                del city_tails[city]
+
+    try:
+        async with queue.iterator() as messages:
+            async for msg in messages:
+                envelope = is_envelope(getattr(msg, "content_type", None))
+                if envelope:
+                    ENVELOPES_CONSUMED.inc()
+
+                # Cada leitura (avulsa ou do envelope) ocupa um worker e segue a ordem da sua cidade
+                readings: List[asyncio.Task] = []
+                for raw, parse_error, headers in _readings(msg):
+                    MESSAGES_CONSUMED.inc()
+                    await workers.acquire()
+
+                    city = None
+                    if raw is not None and config.preserve_city_order:
+                        city = raw.location.city.strip().casefold()
+                    previous = city_tails.get(city) if city is not None else None
+                    done = asyncio.get_running_loop().create_future()
+                    if city is not None:
+                        city_tails[city] = done
+
+                    trace = _start_trace(headers, raw)
+                    MESSAGES_IN_FLIGHT.inc()
+                    task = asyncio.create_task(
+                        _run(None if envelope else msg, raw, parse_error, city, previous, done, trace)
+                    )
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+                    readings.append(task)
+
+                if envelope:
+                    task = asyncio.create_task(_settle_envelope(msg, readings))
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+    finally:
+        if in_flight:
+            logger.info("⏳ Aguardando %s mensagem(ns) em processamento...", len(in_flight))
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
 
 async def start_consumer():
     conn = await aio_pika.connect_robust(config.rabbit_url)
     channel = await conn.channel()
 
+    # Prefetch limita quantas mensagens não confirmadas o broker entrega de uma vez
+    prefetch = max(1, config.consumer_prefetch)
+    await channel.set_qos(prefetch_count=prefetch)
+
     queue = await channel.declare_queue(config.raw_queue, durable=True)
     publisher = RabbitPublisher()
     await publisher.connect(channel)
 
-    logger.info(f"🎧 Consumindo RAW → {config.raw_queue}")
+    logger.info(
+        "🎧 Consumindo RAW → %s (prefetch=%s, workers=%s, ordem por cidade=%s)",
+        config.raw_queue, prefetch, config.consumer_workers, config.preserve_city_order
+    )
 
     try:
-        async with queue.iterator() as messages:
-            async for msg in messages:
-                async with msg.process():
-                    try:
-                        raw = WeatherPayload.model_validate_json(msg.body)
-                        enriched: EnrichedWeatherPayload = await enrich_payload(raw)
-
-                        logger.info(f"🤖 OK {raw.external_id} → enviando enriquecido")
-                        await publisher.publish_enriched(enriched)
-
-                    except Exception as e:
-                        logger.error(f"❌ Falha ao processar → {e}")
+        await consume(queue, publisher)
     finally:
+        await llm_client.close()
+        dedup_store.close()
         await channel.close()
         await conn.close()
         logger.info("🔌 Conexão com RabbitMQ encerrada.")
@@ -1,7 +1,9 @@
+import time
 import aio_pika
 from typing import Optional
 from core.config import config
 from core.logger import get_logger
+from core.tracing import add_stage, current, elapsed_ms, trace_headers
 
 logger = get_logger("ia.publisher")
 
@@ -27,10 +29,18 @@ class RabbitPublisher:
             raise RuntimeError("Canal do RabbitMQ não inicializado")
 
         body = enriched.model_dump_json().encode()
+        # Continua o trace da mensagem em processamento (etapas do Collector + IA nos headers)
+        trace = current()
 
+        started = time.perf_counter()
         await self.channel.default_exchange.publish(
-            aio_pika.Message(body=body, delivery_mode=aio_pika.DeliveryMode.PERSISTENT),
+            aio_pika.Message(
+                body=body,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                headers=trace_headers(trace) if trace else None,
+            ),
             routing_key=config.enriched_queue,
         )
+        add_stage("publish_ms", elapsed_ms(started))
 
-        logger.info(f"📤 Publicado em → {config.enriched_queue}")
+        logger.info("📤 Publicado em → %s", config.enriched_queue)
@@ -0,0 +1,113 @@
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple
+
+from core.weather_codes import CONDITIONS
+from schemas.enriched_output import PokemonSuggestion
+
+CONDITION_TO_TYPES = {
+    "clear": ["fire", "grass"],
+    "céu limpo": ["fire", "grass"],
+    "sunny": ["fire", "grass"],
+    "partly cloudy": ["normal"],
+    "parcialmente nublado": ["normal"],
+    "cloudy": ["rock", "normal"],
+    "nublado": ["rock", "normal"],
+    "rain": ["water", "electric"],
+    "chuva": ["water", "electric"],
+    "drizzle": ["water"],
+    "snow": ["ice"],
+    "neve": ["ice"],
+    "fog": ["ghost", "dark"],
+    "neblina": ["ghost", "dark"],
+    "thunderstorm": ["electric", "dragon"],
+    "trovoada": ["electric", "dragon"],
+}
+
+TYPE_TO_EXAMPLE_POKEMONS = {
+    "water": ["Squirtle", "Poliwag", "Vaporeon"],
+    "electric": ["Pikachu", "Jolteon", "Magnemite"],
+    "fire": ["Charmander", "Vulpix", "Growlithe"],
+    "grass": ["Bulbasaur", "Oddish", "Leafeon"],
+    "ice": ["Snom", "Lapras", "Glalie"],
+    "rock": ["Geodude", "Onix", "Rhyhorn"],
+    "ghost": ["Gastly", "Misdreavus", "Gengar"],
+    "dark": ["Murkrow", "Sableye", "Houndour"],
+    "normal": ["Rattata", "Pidgey", "Bidoof"],
+    "dragon": ["Dratini", "Bagon", "Gible"],
+}
+
+# Rótulos emitidos pelo Collector (WEATHER_CODE_MAP + fallback de map_condition), da cópia
+# compartilhada de core/weather_codes.py
+COLLECTOR_CONDITIONS = CONDITIONS
+
+
+class RuleResult(NamedTuple):
+    # Resultado imutável e compartilhado entre chamadas
+    types: Tuple[str, ...]
+    suggestions: Tuple[PokemonSuggestion, ...]
+    insights: Tuple[str, ...]
+
+
+def _normalize_condition(cond: str) -> str:
+    if not cond:
+        return ""
+    return cond.strip().lower()
+
+
+def scan_recommendation(condition: str) -> (List[str], List[PokemonSuggestion], List[str]):
+    # Implementação original (normaliza + busca + varredura por substring a cada chamada).
+    # Usada para compilar a tabela e para condições desconhecidas.
+    cond_norm = _normalize_condition(condition)
+    types = CONDITION_TO_TYPES.get(cond_norm)
+    if not types:
+        for key, t in CONDITION_TO_TYPES.items():
+            if key in cond_norm:
+                types = t
+                break
+
+    if not types:
+        types = ["normal"]
+
+    types = list(dict.fromkeys(types))
+
+    suggestions: List[PokemonSuggestion] = []
+    for t in types:
+        examples = TYPE_TO_EXAMPLE_POKEMONS.get(t, [])
+        for ex in examples:
+            reasoning = f"Tipo {t} — apropriado para clima '{condition}'"
+            suggestions.append(PokemonSuggestion(name=ex, reasoning=reasoning))
+            if len(suggestions) >= 6:
+                break
+        if len(suggestions) >= 6:
+            break
+
+    insights = [
+        f"Condição registrada: '{condition}'. Tipos recomendados: {', '.join(types)}.",
+        f"Exemplos de pokémons que se adaptam ao clima: {', '.join([p.name for p in suggestions[:5]])}."
+    ]
+
+    return types, suggestions, insights
+
+
+def _compile(condition: str) -> RuleResult:
+    types, suggestions, insights = scan_recommendation(condition)
+    return RuleResult(tuple(types), tuple(suggestions), tuple(insights))
+
+
+# Compilado no import: rótulo exato -> resultado pronto
+_COMPILED: Dict[str, RuleResult] = {
+    condition: _compile(condition)
+    for condition in dict.fromkeys(COLLECTOR_CONDITIONS + tuple(CONDITION_TO_TYPES))
+}
+
+
+@lru_cache(maxsize=1024)
+def _compile_unknown(condition: str) -> RuleResult:
+    return _compile(condition)
+
+
+def recommend(condition: str) -> RuleResult:
+    result = _COMPILED.get(condition)
+    if result is None:
+        result = _compile_unknown(condition or "")
+    return result
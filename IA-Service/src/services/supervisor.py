@@ -0,0 +1,219 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from typing import Dict, List, Optional
+
+from core.config import config
+from core.logger import get_logger
+from core.metrics import render_snapshots
+from core.tracing import trace_store
+
+logger = get_logger("ia.supervisor")
+
+# Tempo de vida a partir do qual um worker é considerado estável (zera o backoff)
+STABLE_AFTER_SECONDS = 60.0
+MAX_RESTART_BACKOFF_SECONDS = 60.0
+
+
+async def _worker_loop(index: int, status_queue):
+    from core.metrics import registry
+    from services.ia_service import service_stats
+    from services.rabbit_consumer import start_consumer
+
+    loop = asyncio.get_running_loop()
+    consumer = asyncio.create_task(start_consumer())
+    # SIGTERM do supervisor: cancela o consumo e deixa o finally drenar as mensagens em voo
+    loop.add_signal_handler(signal.SIGTERM, consumer.cancel)
+
+    def report():
+        status_queue.put({
+            "worker": index,
+            "pid": os.getpid(),
+            "at": time.time(),
+            "stats": service_stats(),
+            "metrics": registry.snapshot(),
+            "traces": trace_store.take_unsent(),
+        })
+
+    async def heartbeat():
+        while True:
+            report()
+            await asyncio.sleep(config.worker_heartbeat_seconds)
+
+    beat = asyncio.create_task(heartbeat())
+    try:
+        await consumer
+    except asyncio.CancelledError:
+        pass
+    finally:
+        beat.cancel()
+        # Último status (stats e traces das mensagens drenadas no encerramento)
+        report()
+
+
+def _worker_main(index: int, status_queue):
+    # Ctrl+C chega ao grupo inteiro; quem coordena o encerramento é o supervisor
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logger.info("👷 Worker %s iniciado (pid %s)", index, os.getpid())
+    asyncio.run(_worker_loop(index, status_queue))
+    logger.info("👋 Worker %s finalizado (pid %s)", index, os.getpid())
+
+
+class WorkerSlot:
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[multiprocessing.Process] = None
+        self.started_at = 0.0
+        self.restart_at = 0.0
+        self.backoff = config.worker_restart_backoff_seconds
+        self.restarts = 0
+        self.last_exit_code: Optional[int] = None
+        self.last_heartbeat = 0.0
+        self.stats: Dict = {}
+        self.metrics: Dict = {}
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def healthy(self, now: float) -> bool:
+        # Vivo e com heartbeat recente (tolerância de 3 intervalos)
+        return self.alive and now - self.last_heartbeat <= 3 * config.worker_heartbeat_seconds
+
+
+class WorkerSupervisor:
+    # Mantém N processos worker (spawn), reinicia os que caem e agrega a saúde deles
+    def __init__(self, processes: int):
+        self._ctx = multiprocessing.get_context("spawn")
+        self._status_queue = self._ctx.Queue()
+        self.slots: List[WorkerSlot] = [WorkerSlot(i) for i in range(max(1, processes))]
+        self._stopping = False
+        self._stopped = False
+
+    def _spawn(self, slot: WorkerSlot):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(slot.index, self._status_queue),
+            name=f"ia-worker-{slot.index}",
+        )
+        process.start()
+        slot.process = process
+        slot.started_at = time.monotonic()
+        slot.last_heartbeat = time.time()
+
+    def _drain_status(self):
+        while True:
+            try:
+                status = self._status_queue.get_nowait()
+            except queue.Empty:
+                return
+            slot = self.slots[status["worker"]]
+            if slot.process is not None and slot.process.pid == status["pid"]:
+                slot.last_heartbeat = status["at"]
+                slot.stats = status["stats"]
+                slot.metrics = status["metrics"]
+            # Traces dos workers ficam consultáveis no processo pai (GET /traces)
+            trace_store.merge(status["traces"])
+
+    def _check_workers(self):
+        now = time.monotonic()
+
+        for slot in self.slots:
+            if slot.alive or self._stopping:
+                continue
+
+            if slot.process is not None:
+                # Worker caiu: agenda o restart com backoff exponencial
+                slot.last_exit_code = slot.process.exitcode
+                slot.process.close()
+                slot.process = None
+
+                if now - slot.started_at >= STABLE_AFTER_SECONDS:
+                    slot.backoff = config.worker_restart_backoff_seconds
+                slot.restart_at = now + slot.backoff
+                logger.error(
+                    "💥 Worker %s saiu (código %s) — reiniciando em %.1fs",
+                    slot.index, slot.last_exit_code, slot.backoff
+                )
+                slot.backoff = min(MAX_RESTART_BACKOFF_SECONDS, slot.backoff * 2)
+
+            if now >= slot.restart_at:
+                slot.restarts += 1
+                self._spawn(slot)
+
+    async def run(self):
+        logger.info("🧭 Supervisor iniciando %s worker(s)", len(self.slots))
+        for slot in self.slots:
+            self._spawn(slot)
+
+        try:
+            while not self._stopping:
+                self._drain_status()
+                self._check_workers()
+                await asyncio.sleep(0.5)
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        if self._stopped:
+            return
+        self._stopping = self._stopped = True
+
+        alive = [slot.process for slot in self.slots if slot.alive]
+        logger.info("🛑 Encerrando %s worker(s)...", len(alive))
+        for process in alive:
+            process.terminate()
+
+        # Drena a fila de status enquanto espera: com o pipe cheio, a thread do Queue no
+        # worker não termina e o processo não sai (e os últimos stats/traces se perderiam)
+        deadline = time.monotonic() + config.worker_shutdown_timeout_seconds
+        while any(process.is_alive() for process in alive) and time.monotonic() < deadline:
+            self._drain_status()
+            await asyncio.sleep(0.1)
+
+        # join bloqueia: roda fora do event loop
+        loop = asyncio.get_running_loop()
+        for process in alive:
+            if process.is_alive():
+                logger.warning("⚠ Worker pid %s não encerrou a tempo — forçando kill", process.pid)
+                process.kill()
+                await loop.run_in_executor(None, process.join)
+
+        self._drain_status()
+        logger.info("🔌 Workers encerrados.")
+
+    def request_stop(self):
+        self._stopping = True
+
+    def metrics(self) -> str:
+        # Último snapshot de cada worker, diferenciado pelo label "worker"
+        return render_snapshots([
+            ({"worker": str(slot.index)}, slot.metrics) for slot in self.slots if slot.metrics
+        ])
+
+    def health(self) -> Dict:
+        now = time.time()
+        healthy = sum(1 for slot in self.slots if slot.healthy(now))
+        return {"workers": len(self.slots), "healthy": healthy}
+
+    def stats(self) -> Dict:
+        now = time.time()
+        return {
+            **self.health(),
+            "processes": [
+                {
+                    "worker": slot.index,
+                    "pid": slot.process.pid if slot.alive else None,
+                    "alive": slot.alive,
+                    "healthy": slot.healthy(now),
+                    "restarts": slot.restarts,
+                    "last_exit_code": slot.last_exit_code,
+                    "last_heartbeat_age_seconds": round(now - slot.last_heartbeat, 1) if slot.last_heartbeat else None,
+                    "stats": slot.stats,
+                }
+                for slot in self.slots
+            ],
+        }